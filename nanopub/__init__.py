@@ -1,7 +1,10 @@
 from ._version import __version__
 from .nanopub_conf import NanopubConf
 
+from .cache import DiskQueryCache, MemoryQueryCache
 from .client import NanopubClient
+from .server_health import ServerHealth
+from .async_client import AsyncNanopubClient
 from .profile import Profile, load_profile, generate_keyfiles
 from .nanopub import Nanopub
 
@@ -0,0 +1,228 @@
+"""
+This module includes an asyncio client for the nanopub server.
+"""
+import asyncio
+import functools
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import AsyncIterator, Iterable, List, Optional, Union
+
+import rdflib
+
+from nanopub import namespaces
+from nanopub.cache import QueryCache, cache_key
+from nanopub.client import NanopubClient
+from nanopub.definitions import HTTP_POOL_SIZE, NANOPUB_REGISTRY_URLS
+from nanopub.nanopub import Nanopub
+from nanopub.nanopub_conf import NanopubConf
+from nanopub.server_health import ServerHealth
+from nanopub.transport import HttpTransport
+
+
+class AsyncNanopubClient:
+    """
+    Searches and fetches published nanopublications from asyncio code, with a bounded number of
+    concurrent requests.
+
+    The requests are sent by the pooled HttpTransport in a pool of threads, so the event loop is
+    never blocked. The searches return async generators: the next page of results is requested
+    while the current one is consumed, and closing the generator, or cancelling the task iterating
+    it, cancels that request. Use the client as an async context manager to release its threads.
+
+    Args:
+        use_test_server (bool): Toggle using the test nanopub server.
+        use_server (str): Provide the URL of a nanopub server to use
+        transport (HttpTransport): HTTP transport used for the queries, the shared default one if None
+        cache (QueryCache): Cache of the search results, None to always query the servers
+        server_health (ServerHealth): Health of the query servers, the shared default one if None
+        max_concurrency (int): Number of requests sent at the same time by all the calls of the client
+        executor (Executor): Send the requests in this executor instead of a pool of max_concurrency
+            threads owned by the client
+    """
+
+    def __init__(
+        self,
+        use_test_server=False,
+        use_server=NANOPUB_REGISTRY_URLS[0],
+        transport: Optional[HttpTransport] = None,
+        cache: Optional[QueryCache] = None,
+        server_health: Optional[ServerHealth] = None,
+        max_concurrency: int = HTTP_POOL_SIZE,
+        executor: Optional[Executor] = None,
+    ):
+        self.client = NanopubClient(
+            use_test_server=use_test_server,
+            use_server=use_server,
+            transport=transport,
+            cache=cache,
+            server_health=server_health,
+        )
+        self.max_concurrency = max_concurrency
+        self._own_executor = executor is None
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="nanopub")
+        self._executor = executor
+        # asyncio primitives are bound to the event loop they are first used in
+        self._semaphore = None
+        self._semaphore_loop = None
+
+    @property
+    def use_test_server(self) -> bool:
+        return self.client.use_test_server
+
+    @property
+    def transport(self) -> HttpTransport:
+        return self.client.transport
+
+    @property
+    def cache(self) -> Optional[QueryCache]:
+        return self.client.cache
+
+    def find_nanopubs_with_text(
+        self, text: str, pubkey: str = None, filter_retracted: bool = True
+    ) -> AsyncIterator[dict]:
+        """Text search, see NanopubClient.find_nanopubs_with_text.
+
+        Returns:
+            async generator of dicts depicting matching nanopublications.
+        """
+        if len(text) == 0:
+            return _no_results()
+        endpoint, params = NanopubClient._text_query(text, pubkey, filter_retracted)
+        return self._search(endpoint=endpoint, params=params)
+
+    def find_nanopubs_with_pattern(
+        self,
+        subj: str = None,
+        pred: str = None,
+        obj: str = None,
+        filter_retracted: bool = True,
+        pubkey: str = None,
+    ) -> AsyncIterator[dict]:
+        """Pattern search, see NanopubClient.find_nanopubs_with_pattern.
+
+        Returns:
+            async generator of dicts depicting matching nanopublications.
+        """
+        endpoint, params = NanopubClient._pattern_query(subj, pred, obj, filter_retracted, pubkey)
+        return self._search(endpoint=endpoint, params=params)
+
+    def find_things(
+        self,
+        type: str,
+        searchterm: str = "*:*",
+        pubkey: str = None,
+        filter_retracted: bool = True,
+    ) -> AsyncIterator[dict]:
+        """Search things (experimental), see NanopubClient.find_things.
+
+        Returns:
+            async generator of dicts depicting matching nanopublications.
+        """
+        endpoint, params = NanopubClient._things_query(type, searchterm, pubkey, filter_retracted)
+        return self._search(endpoint=endpoint, params=params)
+
+    async def find_retractions_of(
+        self, source: Union[str, Nanopub], valid_only=True
+    ) -> List[str]:
+        """Find retractions of given URI, see NanopubClient.find_retractions_of.
+
+        Returns:
+            List of uris that retract the given URI
+        """
+        uri = self.client._retracted_uri(source)
+        public_key = await self._run(self.client._retracted_public_key, uri) if valid_only else None
+        endpoint, params = NanopubClient._pattern_query(
+            pred=namespaces.NPX.retracts,
+            obj=rdflib.URIRef(uri),
+            pubkey=public_key,
+            filter_retracted=False,
+        )
+        return [result["np"] async for result in self._search(endpoint=endpoint, params=params)]
+
+    async def fetch(self, uri: str) -> Nanopub:
+        """Fetch the nanopublication with the given URI from the servers"""
+        conf = NanopubConf(use_test_server=self.use_test_server, transport=self.transport)
+        return await self._run(Nanopub, source_uri=uri, conf=conf)
+
+    async def fetch_all(self, uris: Iterable[str], return_exceptions: bool = False) -> List[Nanopub]:
+        """Fetch nanopublications concurrently, and return them in the order of the URIs.
+
+        If a fetch fails, the error is raised and the other fetches are cancelled, unless
+        return_exceptions is True: the errors are then returned in place of the nanopublications.
+        """
+        tasks = [asyncio.ensure_future(self.fetch(uri)) for uri in uris]
+        try:
+            return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def close(self) -> None:
+        """Release the threads of the client, the requests already sent are completed in the background"""
+        if self._own_executor:
+            self._executor.shutdown(wait=False)
+        self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+    async def _search(self, endpoint: str, params: dict) -> AsyncIterator[dict]:
+        """
+        General nanopub server search method, see NanopubClient._search. The next page of
+        results is requested while the results of the current one are consumed. Stale cached
+        results are searched again in a background thread of the NanopubClient. The cache is
+        used in the executor too: the DiskQueryCache reads and writes files.
+        """
+        cache = self.client.cache
+        if cache is not None:
+            cached = await self._run(self.client._cached_results, endpoint, params)
+            if cached is not None:
+                for result in cached:
+                    yield result
+                return
+        results = [] if cache is not None else None
+        r, _query_url = await self._run(self.client._query_api_try_servers, params, endpoint)
+        seen = {r.url}
+        next_page = None
+        try:
+            while r is not None:
+                next_url = self.client._next_page_url(r)
+                if next_url and next_url not in seen:
+                    seen.add(next_url)
+                    next_page = asyncio.ensure_future(self._run(self.client._query_page, next_url))
+                else:
+                    next_page = None
+                for result in self.client._parse_search_page(r):
+                    if results is not None:
+                        results.append(dict(result))
+                    yield result
+                r = await next_page if next_page is not None else None
+        finally:
+            # The caller can stop before the last page
+            if next_page is not None:
+                next_page.cancel()
+        # Only complete results are cached
+        if results is not None:
+            await self._run(cache.store, cache_key(endpoint, params), results)
+
+    async def _run(self, func, *args, **kwargs):
+        """Call a blocking function in the executor, once fewer than max_concurrency calls are running.
+        A call cancelled before it is started in the executor is never started"""
+        async with self._get_semaphore():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+
+async def _no_results() -> AsyncIterator[dict]:
+    return
+    yield
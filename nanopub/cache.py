@@ -0,0 +1,194 @@
+"""
+This module includes the caches of search results that can be given to the nanopub clients.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+from nanopub.definitions import QUERY_CACHE_SIZE, QUERY_CACHE_TTL
+
+
+def cache_key(endpoint: str, params: dict) -> str:
+    """Key of a search in the caches: the endpoint and the parameters, sorted and as strings"""
+    normalized = sorted((str(name), str(value)) for name, value in params.items() if value is not None)
+    return json.dumps([endpoint, normalized], separators=(",", ":"))
+
+
+class QueryCache(ABC):
+    """Base class of the caches of search results, with a time to live and least recently used eviction.
+
+    Results older than ttl are stale: they are still returned during stale_ttl more seconds, while the
+    client searches again in the background to replace them (stale-while-revalidate).
+
+    Args:
+        maxsize (int): Number of searches kept, the least recently used ones are removed first
+        ttl (float): Seconds during which results are fresh
+        stale_ttl (float): Seconds after ttl during which stale results are returned, 0 to never return them
+        clock: Function returning the current time in seconds
+    """
+
+    def __init__(
+        self,
+        maxsize: int = QUERY_CACHE_SIZE,
+        ttl: float = QUERY_CACHE_TTL,
+        stale_ttl: float = 0,
+        clock=time.time,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+        self._revalidating = set()
+        self._revalidating_lock = threading.Lock()
+
+    def lookup(self, key: str) -> Tuple[Optional[List[dict]], bool]:
+        """Return the results of a search and whether they are stale, or (None, False) if they are not cached"""
+        entry = self._get(key)
+        if entry is None:
+            return None, False
+        stored_at, results = entry
+        age = self.clock() - stored_at
+        if age >= self.ttl + self.stale_ttl:
+            self._delete(key)
+            return None, False
+        return results, age >= self.ttl
+
+    def store(self, key: str, results: List[dict]) -> None:
+        self._set(key, (self.clock(), results))
+
+    def start_revalidation(self, key: str) -> bool:
+        """Return True if the results of the search are not already being revalidated, and mark them as such"""
+        with self._revalidating_lock:
+            if key in self._revalidating:
+                return False
+            self._revalidating.add(key)
+            return True
+
+    def end_revalidation(self, key: str) -> None:
+        with self._revalidating_lock:
+            self._revalidating.discard(key)
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove all the cached results"""
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[Tuple[float, List[dict]]]:
+        """Return the time the results of a search were stored and the results, or None"""
+
+    @abstractmethod
+    def _set(self, key: str, entry: Tuple[float, List[dict]]) -> None:
+        """Store the time and the results of a search, and evict the least recently used searches"""
+
+    @abstractmethod
+    def _delete(self, key: str) -> None:
+        """Remove the results of a search, if they are cached"""
+
+
+class MemoryQueryCache(QueryCache):
+    """Cache of search results in memory, shared by the threads of the process. See QueryCache for the arguments"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class DiskQueryCache(QueryCache):
+    """Cache of search results in a directory, one JSON file per search, shared by the processes using it.
+
+    The modification time of the files is their last use, given by the clock.
+    See QueryCache for the other arguments.
+
+    Args:
+        directory (str or Path): Directory of the cache, created if it does not exist
+    """
+
+    def __init__(self, directory: Union[str, Path], *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.directory = Path(directory).expanduser()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def clear(self) -> None:
+        for path in self.directory.glob("*.json"):
+            self._remove(path)
+
+    def _get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            now = self.clock()
+            os.utime(path, (now, now))
+        except (OSError, ValueError):
+            return None
+        if data.get("key") != key:
+            return None
+        return data["stored_at"], data["results"]
+
+    def _set(self, key, entry):
+        stored_at, results = entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "stored_at": stored_at, "results": results}, f)
+            os.utime(tmp_path, (stored_at, stored_at))
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            self._remove(Path(tmp_path))
+            raise
+        self._evict()
+
+    def _delete(self, key):
+        self._remove(self._path(key))
+
+    def _path(self, key: str) -> Path:
+        return self.directory / (hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def _evict(self) -> None:
+        paths = []
+        for path in self.directory.glob("*.json"):
+            try:
+                paths.append((path.stat().st_mtime, path))
+            except OSError:
+                pass
+        if len(paths) > self.maxsize:
+            paths.sort()
+            for _mtime, path in paths[:len(paths) - self.maxsize]:
+                self._remove(path)
+
+    @staticmethod
+    def _remove(path: Path) -> None:
+        try:
+            path.unlink()
+        except OSError:
+            pass
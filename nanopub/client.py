@@ -2,9 +2,11 @@
 This module includes a client for the nanopub server.
 """
 
-import random
+import time
 import warnings
-from typing import Dict, List, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urljoin
 import csv
 from io import StringIO
 
@@ -12,20 +14,30 @@ import rdflib
 import requests
 
 from nanopub import namespaces
+from nanopub.cache import QueryCache, cache_key
 from nanopub.definitions import (
     DUMMY_NANOPUB_URI,
+    HTTP_CONNECT_TIMEOUT,
     NANOPUB_QUERY_URLS,
     NANOPUB_REGISTRY_URLS,
+    QUERY_READ_TIMEOUT,
     TEST_NANOPUB_QUERY_URL,
     TEST_NANOPUB_REGISTRY_URL,
 )
 from nanopub.nanopub import Nanopub
 from nanopub.nanopub_conf import NanopubConf
+from nanopub.server_health import ServerHealth, get_server_health
+from nanopub.transport import HttpTransport, get_transport
 from nanopub.utils import log
 
 DUMMY_NAMESPACE = rdflib.Namespace(DUMMY_NANOPUB_URI + "/")
 NP_URI = DUMMY_NAMESPACE[""]
 
+# Responses of a query server that is down or overloaded, the query is sent to another server
+SERVER_DOWN_STATUS_CODES = (502, 503, 504)
+# Timeouts of the queries: a server stalling in the middle of a response is a failure too
+QUERY_TIMEOUT = (HTTP_CONNECT_TIMEOUT, QUERY_READ_TIMEOUT)
+
 
 class NanopubClient:
     """
@@ -34,19 +46,31 @@ class NanopubClient:
     Args:
         use_test_server (bool): Toggle using the test nanopub server.
         use_server (str): Provide the URL of a nanopub server to use
+        transport (HttpTransport): HTTP transport used for the queries, the shared default one if None
+        cache (QueryCache): Cache of the search results, e.g. MemoryQueryCache(ttl=60, stale_ttl=600),
+            None to always query the servers
+        server_health (ServerHealth): Health of the query servers choosing the server of each query,
+            the shared default one if None
     """
 
     def __init__(
         self,
         use_test_server=False,
         use_server=NANOPUB_REGISTRY_URLS[0],
+        transport: Optional[HttpTransport] = None,
+        cache: Optional[QueryCache] = None,
+        server_health: Optional[ServerHealth] = None,
     ):
         self.use_test_server = use_test_server
+        self.transport = get_transport(transport)
+        self.server_health = get_server_health(server_health)
+        self.cache = cache
+        self._revalidation_executor = ThreadPoolExecutor(max_workers=1) if cache is not None else None
         if use_test_server:
             self.query_urls = [TEST_NANOPUB_QUERY_URL]
             self.use_server = TEST_NANOPUB_REGISTRY_URL
         else:
-            self.query_urls = NANOPUB_QUERY_URLS
+            self.query_urls = list(NANOPUB_QUERY_URLS)
             self.use_server = use_server
             if use_server not in NANOPUB_REGISTRY_URLS:
                 log.warn(f"{use_server} is not in our list of nanopub servers. {', '.join(NANOPUB_REGISTRY_URLS)}\nMake sure you are using an existing Nanopub server.")
@@ -75,12 +99,7 @@ class NanopubClient:
         """
         if len(text) == 0:
             return []
-        endpoint = "RAMJaSqIk4-qgCud7Kf-ltdE3i8DVP239uQv-BiTGvwUU/fulltext-search-on-labels-all"
-        params = {"query": text}
-        if pubkey:
-            params["pubkey"] = pubkey
-        if filter_retracted:
-            endpoint = "RAWruhiSmyzgZhVRs8QY8YQPAgHzTfl7anxII1de-yaCs/fulltext-search-on-labels"
+        endpoint, params = self._text_query(text, pubkey, filter_retracted)
         return self._search(endpoint=endpoint, params=params)
 
 
@@ -112,19 +131,7 @@ class NanopubClient:
                 'description': A description of the nanopublication (if found in RDF).
 
         """
-        params = {}
-        endpoint = "RAuE9jU8LLwco-iJHiNjzQgEHfx5j-XkbzlutT59cQYiU/find_nanopubs_with_pattern"
-        if subj:
-            params["subj"] = subj
-        if pred:
-            params["pred"] = pred
-        if obj:
-            params["obj"] = obj
-        if pubkey:
-            params["pubkey"] = pubkey
-        if filter_retracted:
-            endpoint = "RAIDPTdWRrYy-TOcdEVmGi7JHwn8fBriVphmsCy3mn4r0/find_valid_nanopubs_with_pattern"
-
+        endpoint, params = self._pattern_query(subj, pred, obj, filter_retracted, pubkey)
         yield from self._search(endpoint=endpoint, params=params)
 
 
@@ -154,17 +161,7 @@ class NanopubClient:
                 'description': A description of the nanopublication (if found in RDF).
 
         """
-        if searchterm == "":
-            raise ValueError(f"Searchterm can not be an empty string: {searchterm}")
-        endpoint = "RA99xFu2qrCrpOYc1zc7h0SYV4m6Z4OE530dguEhYeoOM/find-things"
-        params = dict()
-        params["type"] = type
-        params["query"] = searchterm
-        if pubkey:
-            params["pubkey"] = pubkey
-        if filter_retracted:
-            endpoint = "RARqGauUpDMEA1o4KBSKC8AeP694qJjpbf7x7FOWHDfM8/find-valid-things"
-
+        endpoint, params = self._things_query(type, searchterm, pubkey, filter_retracted)
         yield from self._search(endpoint=endpoint, params=params)
 
 
@@ -183,7 +180,90 @@ class NanopubClient:
         Returns:
             List of uris that retract the given URI
         """
+        uri = self._retracted_uri(source)
+        public_key = self._retracted_public_key(uri) if valid_only else None
+        results = self.find_nanopubs_with_pattern(
+            pred=namespaces.NPX.retracts,
+            obj=rdflib.URIRef(uri),
+            pubkey=public_key,
+            filter_retracted=False,
+        )
+        return [result["np"] for result in results]
+
+
+    def close(self) -> None:
+        """Stop the background thread refreshing the stale cached results, the transport is not closed"""
+        if self._revalidation_executor is not None:
+            self._revalidation_executor.shutdown(wait=False)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    @staticmethod
+    def _text_query(text: str, pubkey: str = None, filter_retracted: bool = True) -> Tuple[str, dict]:
+        """Endpoint and parameters of a text search"""
+        endpoint = "RAMJaSqIk4-qgCud7Kf-ltdE3i8DVP239uQv-BiTGvwUU/fulltext-search-on-labels-all"
+        params = {"query": text}
+        if pubkey:
+            params["pubkey"] = pubkey
+        if filter_retracted:
+            endpoint = "RAWruhiSmyzgZhVRs8QY8YQPAgHzTfl7anxII1de-yaCs/fulltext-search-on-labels"
+        return endpoint, params
+
+
+    @staticmethod
+    def _pattern_query(
+        subj: str = None,
+        pred: str = None,
+        obj: str = None,
+        filter_retracted: bool = True,
+        pubkey: str = None,
+    ) -> Tuple[str, dict]:
+        """Endpoint and parameters of a pattern search"""
+        params = {}
+        endpoint = "RAuE9jU8LLwco-iJHiNjzQgEHfx5j-XkbzlutT59cQYiU/find_nanopubs_with_pattern"
+        if subj:
+            params["subj"] = subj
+        if pred:
+            params["pred"] = pred
+        if obj:
+            params["obj"] = obj
+        if pubkey:
+            params["pubkey"] = pubkey
+        if filter_retracted:
+            endpoint = "RAIDPTdWRrYy-TOcdEVmGi7JHwn8fBriVphmsCy3mn4r0/find_valid_nanopubs_with_pattern"
+        return endpoint, params
+
+
+    @staticmethod
+    def _things_query(
+        type: str,
+        searchterm: str = "*:*",
+        pubkey: str = None,
+        filter_retracted: bool = True,
+    ) -> Tuple[str, dict]:
+        """Endpoint and parameters of a things search"""
+        if searchterm == "":
+            raise ValueError(f"Searchterm can not be an empty string: {searchterm}")
+        endpoint = "RA99xFu2qrCrpOYc1zc7h0SYV4m6Z4OE530dguEhYeoOM/find-things"
+        params = dict()
+        params["type"] = type
+        params["query"] = searchterm
+        if pubkey:
+            params["pubkey"] = pubkey
+        if filter_retracted:
+            endpoint = "RARqGauUpDMEA1o4KBSKC8AeP694qJjpbf7x7FOWHDfM8/find-valid-things"
+        return endpoint, params
+
 
+    def _retracted_uri(self, source: Union[str, Nanopub]) -> str:
+        """URI of the publication to find retractions for, with a warning if it lives on the other server"""
         if isinstance(source, Nanopub):
             if source.is_test_publication and not self.use_test_server:
                 warnings.warn(
@@ -195,36 +275,27 @@ class NanopubClient:
                     "You are trying to find retractions on the test server, "
                     "whereas this publication lives on the production server"
                 )
-            uri = source.source_uri
-        else:
-            uri = source
-
-        if valid_only:
-            source_publication = Nanopub(
-                source_uri=uri,
-                conf=NanopubConf(use_test_server=self.use_test_server)
-            )
-            public_key = source_publication.signed_with_public_key
-            if public_key is None:
-                raise ValueError("The source publication is not signed with a public key")
-        else:
-            public_key = None
+            return source.source_uri
+        return source
 
-        results = self.find_nanopubs_with_pattern(
-            pred=namespaces.NPX.retracts,
-            obj=rdflib.URIRef(uri),
-            pubkey=public_key,
-            filter_retracted=False,
+
+    def _retracted_public_key(self, uri: str) -> str:
+        """Fetch the publication to find retractions for, and return the public key it is signed with"""
+        source_publication = Nanopub(
+            source_uri=uri,
+            conf=NanopubConf(use_test_server=self.use_test_server, transport=self.transport)
         )
-        return [result["np"] for result in results]
+        public_key = source_publication.signed_with_public_key
+        if public_key is None:
+            raise ValueError("The source publication is not signed with a public key")
+        return public_key
 
 
-    @staticmethod
-    def _query_api(params: dict, endpoint: str, query_url: str) -> requests.Response:
+    def _query_api(self, params: dict, endpoint: str, query_url: str) -> requests.Response:
         """Query a specific Nanopub Query endpoint."""
         headers = {"Accept": "application/json"}
         url = query_url + endpoint
-        return requests.get(url, params=params, headers=headers)
+        return self.transport.get(url, params=params, headers=headers, timeout=QUERY_TIMEOUT)
 
 
     def _query_api_try_servers(
@@ -233,25 +304,42 @@ class NanopubClient:
         """Query the Nanopub Query endpoint.
 
         Query a Nanopub Query endpoint (for example: 'RARqGauUpDMEA1o4KBSKC8AeP694qJjpbf7x7FOWHDfM8/find-valid-things').
-        Try several of the Nanopub Query servers.
+        Try several of the Nanopub Query servers, the fastest healthy one first (see ServerHealth),
+        until one of them responds. A server sending no data for QUERY_READ_TIMEOUT seconds counts
+        as a failure, and the next one is tried.
 
         Returns:
             tuple of: r: request response, query_url: url of the Nanopub Query server used.
         """
         r = None
-        random.shuffle(self.query_urls)  # To balance load across servers
-        for query_url in self.query_urls:
-            r = self._query_api(params, endpoint, query_url)
-            if r.status_code == 502:  # Server is likely down
+        error = None
+        for query_url in self.server_health.order(self.query_urls):
+            start = time.perf_counter()
+            try:
+                r = self._query_api(params, endpoint, query_url)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                r, error = None, e
+                self.server_health.record_failure(query_url)
+                warnings.warn(
+                    f"Could not get response from {query_url} ({type(e).__name__}), trying other servers"
+                )
+                continue
+            if r.status_code in SERVER_DOWN_STATUS_CODES:  # Server is likely down
+                self.server_health.record_failure(query_url)
                 warnings.warn(
                     f"Could not get response from {query_url}, trying other servers"
                 )
             else:
-                r.raise_for_status()  # For non-502 errors we don't want to try other servers
+                # Other errors are neither a failure of the server nor a valid answer
+                if 200 <= r.status_code < 300:
+                    self.server_health.record_success(query_url, time.perf_counter() - start)
+                r.raise_for_status()  # For other errors we don't want to try other servers
                 return r, query_url
         resp = ""
-        if r:
+        if r is not None:
             resp = f" Last response: {r.status_code}:{r.reason}"
+        elif error is not None:
+            resp = f" Last error: {error}"
         raise requests.HTTPError(
             f"Could not get response from any of the Nanopub Query servers "
             f"endpoints.{resp}"
@@ -263,6 +351,10 @@ class NanopubClient:
         General nanopub server search method. User should use e.g. find_nanopubs_with_text,
         find_things etc.
 
+        The results are streamed page by page: the response of the server found by
+        _query_api_try_servers is used as first page, and the next pages are requested from
+        the same server, each one in the background while the results of the previous one are consumed.
+
         Args:
             endpoint: garlic endpoint to query, for example: find_things
             params: dictionary with parameters for get request
@@ -271,18 +363,60 @@ class NanopubClient:
             JSONDecodeError: in case response can't be serialized as JSON, this can happen due to a
                 virtuoso error.
         """
-        # First try different servers
-        r, query_url = self._query_api_try_servers(params, endpoint)
-        # If we have found a Nanopub Query server we should use that for further queries (so
-        # pagination works properly)
-        r = self._query_api(params, endpoint, query_url)
-        r.raise_for_status()
+        if self.cache is None:
+            yield from self._search_servers(endpoint, params)
+            return
+        results = self._cached_results(endpoint, params)
+        if results is not None:
+            yield from results
+            return
+        results = []
+        for result in self._search_servers(endpoint, params):
+            results.append(dict(result))
+            yield result
+        # Only complete results are cached
+        self.cache.store(cache_key(endpoint, params), results)
+
+
+    def _search_servers(self, endpoint: str, params: dict) -> Iterator[dict]:
+        """Search the servers, without the cache"""
+        r, _query_url = self._query_api_try_servers(params, endpoint)
+        for page in self._iter_pages(r):
+            yield from self._parse_search_page(page)
+
+
+    def _cached_results(self, endpoint: str, params: dict) -> Optional[List[dict]]:
+        """Results of a search from the cache, or None. Stale results are searched again in the background"""
+        key = cache_key(endpoint, params)
+        results, stale = self.cache.lookup(key)
+        if results is None:
+            return None
+        if stale and self.cache.start_revalidation(key):
+            try:
+                self._revalidation_executor.submit(self._revalidate, key, endpoint, params)
+            except RuntimeError:
+                # The client is closed, the stale results are refreshed by the next search after they expire
+                self.cache.end_revalidation(key)
+        return [dict(result) for result in results]
+
+
+    def _revalidate(self, key: str, endpoint: str, params: dict) -> None:
+        try:
+            self.cache.store(key, list(self._search_servers(endpoint, params)))
+        except Exception as e:
+            log.warning(f"Could not refresh the cached results of {endpoint}: {e}")
+        finally:
+            self.cache.end_revalidation(key)
 
+
+    @classmethod
+    def _parse_search_page(cls, page: requests.Response) -> List[dict]:
+        """Parse the results of a page of search results"""
         # Check if JSON was actually returned. HTML can be returned instead
         # if e.g. virtuoso errors on the backend (due to spaces in the search
         # string, for example).
         try:
-            results = r.json()
+            results = page.json()
         except ValueError as e:
             # Try to give a more understandable error to user when the response
             # is not JSON...
@@ -293,8 +427,49 @@ class NanopubClient:
             ) from e
 
         bindings = results["results"]["bindings"]
-        for result in bindings:
-            yield self._parse_search_result(result)
+        return [cls._parse_search_result(result) for result in bindings]
+
+
+    def _iter_pages(self, r: requests.Response) -> Iterator[requests.Response]:
+        """Generate a response and the pages following it, given by the Link: <...>; rel="next" headers.
+        The next page is requested in a background thread while the current one is used."""
+        executor = None
+        future = None
+        seen = {r.url}
+        try:
+            while True:
+                next_url = self._next_page_url(r)
+                if next_url and next_url not in seen:
+                    seen.add(next_url)
+                    if executor is None:
+                        executor = ThreadPoolExecutor(max_workers=1)
+                    future = executor.submit(self._query_page, next_url)
+                else:
+                    future = None
+                yield r
+                if future is None:
+                    return
+                r = future.result()
+        finally:
+            # The caller can stop before the last page
+            if future is not None:
+                future.cancel()
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+
+    @staticmethod
+    def _next_page_url(r: requests.Response) -> Optional[str]:
+        """Full URL of the page following a response, given by its Link: <...>; rel="next" header"""
+        next_url = r.links.get("next", {}).get("url")
+        return urljoin(r.url, next_url) if next_url else None
+
+
+    def _query_page(self, url: str) -> requests.Response:
+        """Query a page of results given by the server as a full URL"""
+        r = self.transport.get(url, headers={"Accept": "application/json"}, timeout=QUERY_TIMEOUT)
+        r.raise_for_status()
+        return r
 
 
     @staticmethod
@@ -322,7 +497,7 @@ class NanopubClient:
         """Query a Nanopub Query endpoint and request CSV response."""
         headers = {"Accept": "text/csv"}
         url = query_url + endpoint
-        return requests.get(url, params=params, headers=headers).text
+        return self.transport.get(url, params=params, headers=headers).text
 
     def _query_api_parsed(
         self,
@@ -28,6 +28,24 @@ MAX_NP_PER_INDEX = 1100
 MAX_TRIPLES_PER_NANOPUB = 1200
 
 RSA_KEY_SIZE = 2048
+# Number of parsed public keys kept in memory to verify signatures
+PUBLIC_KEY_CACHE_SIZE = 256
+
+# Connections kept open to each nanopub server, and seconds to wait for a connection
+HTTP_POOL_SIZE = 10
+HTTP_CONNECT_TIMEOUT = 10
+# Seconds to wait for data from a query server, before trying the next one
+QUERY_READ_TIMEOUT = 30
+
+# Searches kept by the query caches, and seconds their results are fresh
+QUERY_CACHE_SIZE = 1024
+QUERY_CACHE_TTL = 300
+
+# Weight of the last query in the moving averages of the query servers latency and errors,
+# consecutive failures after which a server is tried last, and for how many seconds
+SERVER_LATENCY_ALPHA = 0.3
+SERVER_FAILURE_THRESHOLD = 2
+SERVER_COOLDOWN = 30
 
 NANOPUB_QUERY_URLS = [
     'https://query.knowledgepixels.com/api/',
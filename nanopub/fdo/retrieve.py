@@ -1,5 +1,7 @@
-import requests
+from typing import Optional
+
 from nanopub import NanopubClient, Nanopub
+from nanopub.transport import HttpTransport, get_transport
 from nanopub.fdo.utils import looks_like_handle
 from nanopub.fdo.fdo_record import FdoRecord
 from nanopub.fdo import FdoNanopub
@@ -59,9 +61,9 @@ def retrieve_content_from_id(iri_or_handle: str):
     raise NotImplementedError("Not implemented yet")
 
 
-def resolve_handle_metadata(handle: str) -> dict:
+def resolve_handle_metadata(handle: str, transport: Optional[HttpTransport] = None) -> dict:
     url = f"https://hdl.handle.net/api/handles/{handle}"
-    response = requests.get(url)
+    response = get_transport(transport).get(url)
     response.raise_for_status()
     return response.json()
 
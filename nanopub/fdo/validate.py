@@ -1,12 +1,15 @@
 import json
-import requests
+from typing import Optional
+
 from pyshacl import validate
 from rdflib import Graph
 from nanopub.fdo.utils import convert_jsonschema_to_shacl
 from nanopub.fdo.fdo_record import FdoRecord 
+from nanopub.transport import HttpTransport, get_transport
 
 
-def validate_fdo_record(record: FdoRecord) -> bool:
+def validate_fdo_record(record: FdoRecord, transport: Optional[HttpTransport] = None) -> bool:
+    transport = get_transport(transport)
     try:
         profile_uri = record.get_profile()
         if not profile_uri:
@@ -15,7 +18,7 @@ def validate_fdo_record(record: FdoRecord) -> bool:
 
         handle = str(profile_uri).split("/")[-1]
         profile_api_url = f"https://hdl.handle.net/api/handles/{handle}"
-        profile_response = requests.get(profile_api_url)
+        profile_response = transport.get(profile_api_url)
         profile_data = profile_response.json()
 
         jsonschema_entry = next(
@@ -35,7 +38,7 @@ def validate_fdo_record(record: FdoRecord) -> bool:
             print("JSON Schema $ref not found.")
             return False
 
-        schema_response = requests.get(jsonschema_url)
+        schema_response = transport.get(jsonschema_url)
         json_schema = schema_response.json()
         shape_graph = convert_jsonschema_to_shacl(json_schema)
 
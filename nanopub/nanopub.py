@@ -6,19 +6,65 @@ import re
 from copy import deepcopy
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Union
+from typing import Any, Callable, List, Optional, Union
+from weakref import WeakKeyDictionary
 
 import rdflib
-import requests
 from rdflib import BNode, ConjunctiveGraph, Graph, URIRef
+from rdflib.events import Event
 from rdflib.namespace import DC, DCTERMS, FOAF, PROV, RDF, XSD
+from rdflib.store import Store, TripleAddedEvent, TripleRemovedEvent
 
 from nanopub.definitions import MAX_TRIPLES_PER_NANOPUB, NANOPUB_FETCH_FORMAT, TEST_NANOPUB_REGISTRY_URL
 from nanopub.namespaces import HYCL, NP, NPX, NTEMPLATE, ORCID, PAV
 from nanopub.nanopub_conf import NanopubConf
 from nanopub.profile import ProfileError
-from nanopub.sign_utils import add_signature, publish_graph, verify_signature, verify_trusty
-from nanopub.utils import MalformedNanopubError, NanopubMetadata, extract_np_metadata, log
+from nanopub.sign_utils import add_signature, publish_graph, verify_nanopub, verify_signature, verify_trusty
+from nanopub.transport import get_transport
+from nanopub.utils import (
+    MalformedNanopubError,
+    NanopubMetadata,
+    NanopubVerification,
+    NanopubViolation,
+    extract_np_metadata,
+    log,
+)
+
+_UNNAMED_BNODE = re.compile(r'^[Na-zA-Z0-9]{33}$')
+
+
+class _StoreChanges:
+    """Count the changes notified by the events of a rdflib store"""
+
+    def __init__(self, store: Store) -> None:
+        self.count = 0
+        store.dispatcher.subscribe(TripleAddedEvent, self._on_change)
+        store.dispatcher.subscribe(TripleRemovedEvent, self._on_change)
+
+    def _on_change(self, event: Event) -> None:
+        self.count += 1
+
+
+def _has_subject(g: Graph, subjects: list) -> bool:
+    """Check if a graph contains a triple with one of the given subjects, compared as strings"""
+    for subject in subjects:
+        if (URIRef(str(subject)), None, None) in g:
+            return True
+    # Not found with the index, subjects that are not URIs can still have the same string
+    names = {str(subject) for subject in subjects}
+    return any(str(s) in names for s, _, _ in g)
+
+
+_store_changes: "WeakKeyDictionary[Store, _StoreChanges]" = WeakKeyDictionary()
+
+
+def _get_store_changes(store: Store) -> _StoreChanges:
+    """Get the change counter of a store, shared by all the nanopubs using it"""
+    changes = _store_changes.get(store)
+    if changes is None:
+        changes = _StoreChanges(store)
+        _store_changes[store] = changes
+    return changes
 
 
 class Nanopub:
@@ -46,6 +92,7 @@ class Nanopub:
         conf: NanopubConf = NanopubConf(),
     ) -> None:
         self._profile = conf.profile
+        self._bnode_count = 0
         self._source_uri = source_uri
         self._introduces_concept = introduces_concept
         self._concept_uri: Optional[str] = None
@@ -61,11 +108,12 @@ class Nanopub:
         # source URI, rdflib graph, or file
         if source_uri:
             # If source URI provided we retrieve the nanopub from the servers
-            r = requests.get(source_uri + "." + NANOPUB_FETCH_FORMAT)
+            transport = get_transport(self._conf.transport)
+            r = transport.get(source_uri + "." + NANOPUB_FETCH_FORMAT)
             if not r.ok and self._conf.use_test_server:
                 nanopub_id = source_uri.rsplit("/", 1)[-1]
                 uri_test = TEST_NANOPUB_REGISTRY_URL + nanopub_id
-                r = requests.get(uri_test + "." + NANOPUB_FETCH_FORMAT)
+                r = transport.get(uri_test + "." + NANOPUB_FETCH_FORMAT)
             r.raise_for_status()
             self._rdf = self._preformat_graph(ConjunctiveGraph())
             self._rdf.parse(data=r.text, format=NANOPUB_FETCH_FORMAT)
@@ -88,6 +136,7 @@ class Nanopub:
         self._assertion = Graph(self._rdf.store, self._metadata.assertion)
         self._provenance = Graph(self._rdf.store, self._metadata.provenance)
         self._pubinfo = Graph(self._rdf.store, self._metadata.pubinfo)
+        self._reset_cache()
 
         self._assertion += assertion
         self._provenance += provenance
@@ -173,6 +222,38 @@ class Nanopub:
         self._assertion = Graph(self._rdf.store, self._metadata.assertion)
         self._provenance = Graph(self._rdf.store, self._metadata.provenance)
         self._pubinfo = Graph(self._rdf.store, self._metadata.pubinfo)
+        self._reset_cache()
+
+
+    def _reset_cache(self) -> None:
+        """Drop the values cached from the RDF, and track the changes of the current RDF store"""
+        self._store_changes = _get_store_changes(self._rdf.store)
+        self._cache: dict = {}
+        self._cache_version: Optional[tuple] = None
+
+
+    def _rdf_version(self) -> tuple:
+        """Changes whenever triples are added to or removed from the nanopub RDF.
+        The Memory store does not notify removals, so the size of the graphs is also used"""
+        return (
+            self._store_changes.count,
+            len(self._rdf),
+            len(self._head),
+            len(self._assertion),
+            len(self._provenance),
+            len(self._pubinfo),
+        )
+
+
+    def _cached(self, name: str, compute: Callable[[], Any]) -> Any:
+        """Get a value computed from the RDF, it is only computed again when the RDF changed"""
+        version = self._rdf_version()
+        if version != self._cache_version:
+            self._cache = {}
+            self._cache_version = version
+        if name not in self._cache:
+            self._cache[name] = compute()
+        return self._cache[name]
 
 
     def sign(self) -> None:
@@ -198,7 +279,7 @@ class Nanopub:
         if not self.source_uri:
             self.sign()
 
-        publish_graph(self.rdf, use_server=self._conf.use_server)
+        publish_graph(self.rdf, use_server=self._conf.use_server, transport=self._conf.transport)
         log.info(f'Published {self.source_uri} to {self._conf.use_server}')
         self.published = True
 
@@ -247,51 +328,69 @@ class Nanopub:
         verify_trusty(self._rdf, self.source_uri, self._metadata.namespace)
         return True
 
+    def verify(self) -> NanopubVerification:
+        """Verify the signature and Trusty URI of the nanopub, failures are listed in the returned result"""
+        return deepcopy(self._cached("verification", lambda: verify_nanopub(self._rdf)))
+
+    def _extract_metadata(self) -> NanopubMetadata:
+        """Metadata extracted from the current RDF, unlike self._metadata it is never the defaults for a new nanopub"""
+        return self._cached("metadata", lambda: extract_np_metadata(self._rdf))
+
     @property
     def is_valid(self) -> bool:
-        """Check if a nanopublication is valid"""
-        np_meta = extract_np_metadata(self._rdf)
+        """Check if a nanopublication is valid, raise a MalformedNanopubError for the first violation found"""
+        violations = self.validate()
+        if violations:
+            raise MalformedNanopubError(violations[0].message)
+        return True
+
+    def validate(self) -> List[NanopubViolation]:
+        """Check the structure of the nanopublication, and return the list of rules it violates"""
+        return list(self._cached("violations", self._find_violations))
+
+    def _find_violations(self) -> List[NanopubViolation]:
+        try:
+            np_meta = self._extract_metadata()
+        except MalformedNanopubError as e:
+            return [NanopubViolation("metadata", str(e))]
         np_uri = np_meta.np_uri
+        violations = []
 
         # Check if any of the graph is empty
-        if len(self._head) < 1:
-            raise MalformedNanopubError("The Head graph is empty")
-        if len(self._assertion) < 1:
-            raise MalformedNanopubError("The assertion graph is empty")
-        if len(self._provenance) < 1:
-            raise MalformedNanopubError("The provenance graph is empty")
-        if len(self._pubinfo) < 1:
-            raise MalformedNanopubError("The pubinfo graph is empty")
+        for rule, name, g in [
+            ("empty_head", "Head", self._head),
+            ("empty_assertion", "assertion", self._assertion),
+            ("empty_provenance", "provenance", self._provenance),
+            ("empty_pubinfo", "pubinfo", self._pubinfo),
+        ]:
+            if len(g) < 1:
+                violations.append(NanopubViolation(rule, f"The {name} graph is empty"))
 
         # Check exactly 4 graphs
-        graph_count = 0
-        for c in self._rdf.contexts():
-            if len(list(self._rdf.quads((None, None, None, c)))) > 0:
-                graph_count += 1
+        graph_count = sum(1 for c in self._rdf.contexts() if len(c) > 0)
         if graph_count != 4:
-            raise MalformedNanopubError(f"\033[1mToo many graphs found\033[0m in the provided RDF: {graph_count}. A Nanopub should have only 4 graphs (Head, assertion, provenance, pubinfo)")
-
-        found_prov = False
-        for s, p, o in self._provenance:
-            if str(s) == str(np_meta.assertion):
-                found_prov = True
-                break
-        if not found_prov:
-            raise MalformedNanopubError(f"The provenance graph should contain at least one triple with the assertion graph URI as subject: \033[1m{np_meta.assertion}\033[0m")
-
-        found_pubinfo = False
-        for s, p, o in self._pubinfo:
-            if str(s) == str(np_uri) or str(s) == str(np_meta.namespace):
-                found_pubinfo = True
-                break
-        if not found_pubinfo:
-            raise MalformedNanopubError(f"The pubinfo graph should contain at least one triple that has the nanopub URI as subject: \033[1m{np_uri}\033[0m")
+            violations.append(NanopubViolation(
+                "graph_count",
+                f"\033[1mToo many graphs found\033[0m in the provided RDF: {graph_count}. A Nanopub should have only 4 graphs (Head, assertion, provenance, pubinfo)"
+            ))
+
+        if not _has_subject(self._provenance, [np_meta.assertion]):
+            violations.append(NanopubViolation(
+                "provenance_subject",
+                f"The provenance graph should contain at least one triple with the assertion graph URI as subject: \033[1m{np_meta.assertion}\033[0m"
+            ))
+
+        if not _has_subject(self._pubinfo, [np_uri, np_meta.namespace]):
+            violations.append(NanopubViolation(
+                "pubinfo_subject",
+                f"The pubinfo graph should contain at least one triple that has the nanopub URI as subject: \033[1m{np_uri}\033[0m"
+            ))
 
         # TODO: add more checks for trusty and signature
         # if self._metadata.signature:
         #     if self.has_valid_signature is False:
         #         raise MalformedNanopubError("The nanopub is not valid")
-        return True
+        return violations
 
 
     @property
@@ -370,9 +469,10 @@ class Nanopub:
 
     @property
     def introduces_concept(self):
-        concepts_introduced = list()
-        for s, p, o in self._pubinfo.triples((None, NPX.introduces, None)):
-            concepts_introduced.append(o)
+        concepts_introduced = self._cached(
+            "introduces_concept",
+            lambda: [o for o in self._pubinfo.objects(None, NPX.introduces)]
+        )
 
         if len(concepts_introduced) == 0:
             return None
@@ -388,6 +488,9 @@ class Nanopub:
 
         This is usually something like: http://purl.org/np/RAnksi2yDP7jpe7F6BwWCpMOmzBEcUImkAKUeKEY_2Yus
         """
+        return self._cached("source_uri", self._find_source_uri)
+
+    def _find_source_uri(self) -> Optional[str]:
         for s in self._rdf.subjects(rdflib.RDF.type, NP.Nanopublication):
             extract_trusty = re.search(r'^[a-z0-9+.-]+:\/\/[a-zA-Z0-9\/._-]+\/(RA.*)$', str(s), re.IGNORECASE)
             if extract_trusty:
@@ -397,7 +500,7 @@ class Nanopub:
 
     @property
     def signed_with_public_key(self) -> Optional[str]:
-        np_sig = extract_np_metadata(self._rdf)
+        np_sig = self._extract_metadata()
         if np_sig.public_key:
             return np_sig.public_key
         return None
@@ -575,29 +678,37 @@ class Nanopub:
         Furthermore, the URI the nanopub is published to is not known ahead of time.
         """
         bnode_map: dict = {}
-        for s, p, o, c in g.quads():
-            if isinstance(s, BNode):
-                g.remove((s, p, o, c))
-                if str(s) not in bnode_map:
-                    if re.match(r'^[Na-zA-Z0-9]{33}$', str(s)):
-                        # Unnamed BNode looks like N2c21867a547345d9b8a203a7c1cd7e0c
-                        self._bnode_count += 1
-                        bnode_map[str(s)] = self._bnode_count
-                    else:
-                        bnode_map[str(s)] = str(s)
-                s = self._metadata.namespace[f"_{bnode_map[str(s)]}"]
-                g.add((s, p, o, c))
-
-            if isinstance(o, BNode):
-                g.remove((s, p, o, c))
-                if str(o) not in bnode_map:
-                    # if str(o).startswith("N") and len(str(o)) == 33:
-                    if re.match(r'^[Na-zA-Z0-9]{33}$', str(s)):
-                        self._bnode_count += 1
-                        bnode_map[str(o)] = self._bnode_count
-                    else:
-                        bnode_map[str(o)] = str(o)
-                o = self._metadata.namespace[f"_{bnode_map[str(o)]}"]
-
-                g.add((s, p, o, c))
+        old_quads = []
+        new_quads = []
+        # Collect the mapping in a single pass over the quads, then swap the affected quads in bulk
+        for quad in g.quads():
+            s, p, o, c = quad
+            s_bnode = isinstance(s, BNode)
+            o_bnode = isinstance(o, BNode)
+            if not s_bnode and not o_bnode:
+                continue
+            if s_bnode:
+                s = self._metadata.namespace[f"_{self._map_blank_node(bnode_map, str(s))}"]
+            if o_bnode:
+                o = self._metadata.namespace[f"_{self._map_blank_node(bnode_map, str(o))}"]
+            old_quads.append(quad)
+            new_quads.append((s, p, o, c))
+
+        if not old_quads:
+            return g
+        for quad in old_quads:
+            g.remove(quad)
+        g.addN(new_quads)
         return g
+
+
+    def _map_blank_node(self, bnode_map: dict, bnode: str) -> Union[int, str]:
+        """Get the name of a blank node in the dummy namespace, unnamed blank nodes are numbered"""
+        if bnode not in bnode_map:
+            if _UNNAMED_BNODE.match(bnode):
+                # Unnamed BNode looks like N2c21867a547345d9b8a203a7c1cd7e0c
+                self._bnode_count += 1
+                bnode_map[bnode] = self._bnode_count
+            else:
+                bnode_map[bnode] = bnode
+        return bnode_map[bnode]
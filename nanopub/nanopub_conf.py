@@ -3,6 +3,7 @@ from typing import Optional
 
 from nanopub.definitions import NANOPUB_REGISTRY_URLS
 from nanopub.profile import Profile
+from nanopub.transport import HttpTransport
 
 
 @dataclass
@@ -20,6 +21,7 @@ class NanopubConf:
         assertion_attributed_to: Optional str
         publication_attributed_to: Optional str
         derived_from: Optional str
+        transport: HttpTransport used for the requests to the nanopub servers, the shared default one if None
     """
 
     profile: Optional[Profile] = None
@@ -38,5 +40,7 @@ class NanopubConf:
 
     derived_from: Optional[str] = None
 
+    transport: Optional[HttpTransport] = None
+
 
     dict = asdict
@@ -8,6 +8,7 @@ from typing import Optional, Union
 
 import yatiml
 from Crypto.PublicKey import RSA
+from Crypto.Signature import PKCS1_v1_5
 
 from nanopub.definitions import DEFAULT_PROFILE_PATH, RSA_KEY_SIZE, USER_CONFIG_DIR
 from nanopub.utils import log
@@ -44,6 +45,7 @@ class Profile:
             introduction_nanopub_uri: Optional[str] = None
     ) -> None:
         """Create a Profile."""
+        self._signer = None
         self._orcid_id = orcid_id
         self._name = name
         self._introduction_nanopub_uri = introduction_nanopub_uri
@@ -66,6 +68,7 @@ class Profile:
         if not public_key and private_key:
             log.info('The public key was not provided when loading the Nanopub profile, generating it from the provided private key')
             key = RSA.import_key(decodebytes(self._private_key.encode()))
+            self._signer = PKCS1_v1_5.new(key)
             self._public_key = format_key(key.publickey().export_key().decode('utf-8'))
         elif isinstance(public_key, Path):
             try:
@@ -88,6 +91,7 @@ class Profile:
 
         self._private_key = format_key(private_key_str)
         self._public_key = format_key(public_key_str)
+        self._signer = PKCS1_v1_5.new(key)
         log.info(f"Public/private RSA key pair has been generated for {self.orcid_id} ({self.name})")
         return public_key_str
 
@@ -154,6 +158,14 @@ introduction_nanopub_uri:{intro_uri}
     @private_key.setter
     def private_key(self, value):
         self._private_key = value
+        self._signer = None
+
+    @property
+    def signer(self):
+        """PKCS#1 v1.5 signer for the private key, parsed once and reused for every signature"""
+        if self._signer is None:
+            self._signer = PKCS1_v1_5.new(RSA.import_key(decodebytes(self._private_key.encode())))
+        return self._signer
 
     @property
     def public_key(self):
@@ -172,6 +184,19 @@ introduction_nanopub_uri:{intro_uri}
         self._introduction_nanopub_uri = value
 
 
+    def __getstate__(self):
+        # The parsed key cannot be pickled, it is parsed again when needed
+        state = self.__dict__.copy()
+        state['_signer'] = None
+        return state
+
+    def __deepcopy__(self, memo):
+        # All attributes are immutable, copies share them to avoid parsing the key again
+        profile = self.__class__.__new__(self.__class__)
+        profile.__dict__.update(self.__dict__)
+        return profile
+
+
     def __repr__(self):
         return f"""\033[1mORCID\033[0m: {self._orcid_id}
 \033[1mName\033[0m: {self._name}
@@ -0,0 +1,146 @@
+"""
+This module includes the health tracker choosing the nanopub query server to send a query to.
+"""
+import random
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from nanopub.definitions import SERVER_COOLDOWN, SERVER_FAILURE_THRESHOLD, SERVER_LATENCY_ALPHA
+
+# Lower bound of the success rate dividing the latency, the error rate of a server can reach 1 with alpha = 1
+MIN_SUCCESS_RATE = 0.01
+
+
+class _ServerStats:
+    __slots__ = ("latency", "error_rate", "failures", "opened_at")
+
+    def __init__(self):
+        # Exponentially weighted moving averages, latency is None until a response is received
+        self.latency = None
+        self.error_rate = 0.0
+        # Consecutive failures, and when the circuit was opened (None if it is closed)
+        self.failures = 0
+        self.opened_at = None
+
+
+class ServerHealth:
+    """Latency and errors of the servers, to send each query to the fastest healthy server first.
+
+    The latency and the error rate of a server are exponentially weighted moving averages. The servers
+    are ordered by latency / (1 - error rate): the expected time to get an answer, counting the queries
+    that have to be sent again to another server, as the latency of a failure is not known. After
+    failure_threshold consecutive failures (connection errors, timeouts, or the server being down),
+    the circuit of a server is opened: it is tried after all the other servers during cooldown
+    seconds. Then one query is sent to it first, and its circuit is closed if it succeeds, or opened
+    for another cooldown if it fails. Servers without a response yet are tried first, the ones with
+    fewer errors first.
+
+    Args:
+        alpha (float): Weight of the last query in the moving averages, between 0 and 1
+        failure_threshold (int): Consecutive failures opening the circuit of a server
+        cooldown (float): Seconds during which a server with an open circuit is tried last
+        clock: Function returning the current time in seconds
+    """
+
+    def __init__(
+        self,
+        alpha: float = SERVER_LATENCY_ALPHA,
+        failure_threshold: int = SERVER_FAILURE_THRESHOLD,
+        cooldown: float = SERVER_COOLDOWN,
+        clock=time.monotonic,
+    ):
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self._servers: Dict[str, _ServerStats] = {}
+        self._lock = threading.Lock()
+
+    def order(self, urls: Iterable[str]) -> List[str]:
+        """Order in which to try the servers: a server whose cooldown is over, the servers with a closed circuit
+        by increasing latency / (1 - error rate), then the servers with an open circuit, the least recently
+        opened first. Servers without a response yet are first among the closed ones, by increasing error rate"""
+        now = self.clock()
+        probes, closed, opened = [], [], []
+        with self._lock:
+            for url in urls:
+                stats = self._stats(url)
+                if stats.opened_at is None:
+                    closed.append((self._score(stats), stats.error_rate, random.random(), url))
+                elif now - stats.opened_at >= self.cooldown and not probes:
+                    # Only the query getting it as first server tries it, the next ones wait another cooldown
+                    stats.opened_at = now
+                    probes.append(url)
+                else:
+                    opened.append((stats.opened_at, url))
+        closed.sort()
+        opened.sort()
+        return probes + [url for _score, _error_rate, _tie, url in closed] + [url for _opened_at, url in opened]
+
+    def record_success(self, url: str, seconds: float) -> None:
+        """Record a response of a server, received after the given seconds"""
+        with self._lock:
+            stats = self._stats(url)
+            stats.latency = seconds if stats.latency is None else self._average(stats.latency, seconds)
+            stats.error_rate = self._average(stats.error_rate, 0.0)
+            stats.failures = 0
+            stats.opened_at = None
+
+    def record_failure(self, url: str) -> None:
+        """Record a query that failed because of the server"""
+        with self._lock:
+            stats = self._stats(url)
+            stats.error_rate = self._average(stats.error_rate, 1.0)
+            stats.failures += 1
+            if stats.failures >= self.failure_threshold or stats.opened_at is not None:
+                stats.opened_at = self.clock()
+
+    def is_healthy(self, url: str) -> bool:
+        """True if the circuit of the server is closed"""
+        with self._lock:
+            return self._stats(url).opened_at is None
+
+    def stats(self) -> Dict[str, dict]:
+        """Latency in seconds (None if unknown), error rate and circuit state of each server"""
+        with self._lock:
+            return {
+                url: {
+                    "latency": stats.latency,
+                    "error_rate": stats.error_rate,
+                    "failures": stats.failures,
+                    "healthy": stats.opened_at is None,
+                }
+                for url, stats in self._servers.items()
+            }
+
+    def _stats(self, url: str) -> _ServerStats:
+        stats = self._servers.get(url)
+        if stats is None:
+            stats = self._servers[url] = _ServerStats()
+        return stats
+
+    @staticmethod
+    def _score(stats: _ServerStats) -> float:
+        if stats.latency is None:
+            return 0.0
+        return stats.latency / max(1.0 - stats.error_rate, MIN_SUCCESS_RATE)
+
+    def _average(self, average: float, value: float) -> float:
+        return self.alpha * value + (1 - self.alpha) * average
+
+
+_default_server_health: Optional[ServerHealth] = None
+_default_server_health_lock = threading.Lock()
+
+
+def get_server_health(server_health: Optional[ServerHealth] = None) -> ServerHealth:
+    """Return the given health tracker, or the default one shared by the whole process"""
+    global _default_server_health
+    if server_health is not None:
+        return server_health
+    if _default_server_health is None:
+        with _default_server_health_lock:
+            if _default_server_health is None:
+                _default_server_health = ServerHealth()
+    return _default_server_health
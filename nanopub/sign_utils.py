@@ -1,17 +1,19 @@
 from base64 import decodebytes, encodebytes
+from functools import lru_cache
+from typing import Optional
 
-import requests
 from Crypto.Hash import SHA256
 from Crypto.PublicKey import RSA
 from Crypto.Signature import PKCS1_v1_5
 from rdflib import BNode, ConjunctiveGraph, Graph, Literal, Namespace, URIRef
 
-from nanopub.definitions import NANOPUB_REGISTRY_URLS, NP_PREFIX, NP_TEMP_PREFIX
+from nanopub.definitions import NANOPUB_REGISTRY_URLS, NP_PREFIX, NP_TEMP_PREFIX, PUBLIC_KEY_CACHE_SIZE
 from nanopub.namespaces import NPX
 from nanopub.profile import Profile
+from nanopub.transport import HttpTransport, get_transport
 from nanopub.trustyuri.rdf import RdfHasher, RdfUtils
-from nanopub.trustyuri.rdf.RdfPreprocessor import transform
-from nanopub.utils import MalformedNanopubError, extract_np_metadata, log
+from nanopub.trustyuri.rdf.RdfPreprocessor import preprocess, transform
+from nanopub.utils import MalformedNanopubError, NanopubMetadata, NanopubVerification, extract_np_metadata, log
 
 
 def add_signature(g: ConjunctiveGraph, profile: Profile, dummy_namespace: Namespace, pubinfo_g: Graph) -> ConjunctiveGraph:
@@ -40,20 +42,10 @@ def add_signature(g: ConjunctiveGraph, profile: Profile, dummy_namespace: Namesp
         URIRef(profile.orcid_id),
         pubinfo_g,
     ))
-    # Normalize RDF
+    # Normalize RDF and sign it with the private RSA key
     quads = RdfUtils.get_quads(g)
-    normed_rdf = RdfHasher.normalize_quads(
-        quads,
-        baseuri=str(dummy_namespace),
-        hashstr=" "
-    )
-    # Note: normed_rdf needs to end with a newline
-    # print(f"NORMED RDF STARTS\n{normed_rdf}\nNORMED RDF ENDS")
-
-    # Sign the normalized RDF with the private RSA key
-    private_key = RSA.import_key(decodebytes(profile.private_key.encode()))
-    signer = PKCS1_v1_5.new(private_key)
-    signature_b = signer.sign(SHA256.new(normed_rdf.encode()))
+    sorted_quads = RdfHasher.sort_quads(quads, baseuri=str(dummy_namespace), hashstr=" ")
+    signature_b = profile.signer.sign(RdfHasher.update_sorted_hash(SHA256.new(), sorted_quads))
     signature = encodebytes(signature_b).decode().replace("\n", "")
     log.debug(f"Nanopub signature: {signature}")
 
@@ -65,21 +57,22 @@ def add_signature(g: ConjunctiveGraph, profile: Profile, dummy_namespace: Namesp
         pubinfo_g,
     ))
 
-    # Generate the trusty URI
-    quads = RdfUtils.get_quads(g)
-    trusty_artefact = RdfHasher.make_hash(
-        quads,
+    # Generate the trusty URI, inserting the signature in the already normalized RDF
+    RdfHasher.insert_sorted_quad(
+        sorted_quads,
+        (pubinfo_g.identifier, dummy_namespace["sig"], NPX["hasSignature"], Literal(signature)),
         baseuri=str(dummy_namespace),
         hashstr=" "
     )
+    trusty_artefact = RdfHasher.make_sorted_hash(sorted_quads)
     log.debug(f"Trusty artefact: {trusty_artefact}")
 
     g = replace_trusty_in_graph(trusty_artefact, str(dummy_namespace), g)
     return g
 
 
-def replace_trusty_in_graph(trusty_artefact: str, dummy_ns: str, graph: ConjunctiveGraph):
-    """Replace all references to the dummy namespace by the Trusty artefact in a Graph"""
+def replace_trusty_in_graph(trusty_artefact: str, dummy_ns: str, graph: ConjunctiveGraph) -> ConjunctiveGraph:
+    """Build a new Graph where all references to the dummy namespace are replaced by the Trusty artefact"""
     if str(dummy_ns).startswith(NP_TEMP_PREFIX):
         # Replace with http://purl.org/np/ if the http://purl.org/nanopub/temp/
         # prefix is used in the dummy nanopub URI
@@ -87,44 +80,60 @@ def replace_trusty_in_graph(trusty_artefact: str, dummy_ns: str, graph: Conjunct
     else:
         np_uri = dummy_ns + trusty_artefact
 
-    graph.bind("this", Namespace(np_uri))
-    graph.bind("sub", Namespace(np_uri + "/"))
-    graph.bind("", None, replace=True)
+    signed_g = ConjunctiveGraph()
+    for prefix, namespace in graph.namespaces():
+        signed_g.bind(prefix, namespace, replace=True)
+    signed_g.bind("this", Namespace(np_uri))
+    signed_g.bind("sub", Namespace(np_uri + "/"))
+    signed_g.bind("", None, replace=True)
 
-    # Iterate quads in the graph, and replace by the transformed value
+    # Terms are repeated a lot across quads: transform each distinct term only once
     bnodemap: dict = {}
+    transformed: dict = {}
+
+    def replace(term):
+        new_term = transformed.get(term)
+        if new_term is None:
+            new_term = URIRef(transform(term, trusty_artefact, dummy_ns, bnodemap))
+            transformed[term] = new_term
+        return new_term
+
+    signed_quads = []
     for s, p, o, c in graph.quads():
-        if c:
-            g = c.identifier
-        else:
+        if not c:
             raise Exception("Found a nquads without graph when replacing dummy URIs with trusty URIs. Something went wrong.")
-        # new_g = Graph(identifier=str(transform(g, trusty_artefact, dummy_ns, bnodemap)))
-        # Fails and make the nanopub empty
-        new_g = URIRef(transform(g, trusty_artefact, dummy_ns, bnodemap))
-        new_s = URIRef(transform(s, trusty_artefact, dummy_ns, bnodemap))
-        new_p = URIRef(transform(p, trusty_artefact, dummy_ns, bnodemap))
+        new_g = replace(c.identifier)
+        new_s = replace(s)
+        new_p = replace(p)
         new_o = o
         if isinstance(o, URIRef) or isinstance(o, BNode):
-            new_o = URIRef(transform(o, trusty_artefact, dummy_ns, bnodemap))
+            new_o = replace(o)
+        signed_quads.append((new_s, new_p, new_o, new_g))
 
-        graph.remove((s, p, o, c))
-        graph.add((new_s, new_p, new_o, new_g))  # type: ignore
+    signed_g.addN(signed_quads)
+    return signed_g
 
-    return graph
 
-
-def publish_graph(g: ConjunctiveGraph, use_server: str = NANOPUB_REGISTRY_URLS[0]) -> bool:
-    """Publish a signed nanopub to the given nanopub server.
+def publish_graph(
+    g: ConjunctiveGraph, use_server: str = NANOPUB_REGISTRY_URLS[0], transport: Optional[HttpTransport] = None
+) -> bool:
+    """Publish a signed nanopub to the given nanopub server, with the given HttpTransport or the default one.
     """
     log.info(f"Publishing to the nanopub server {use_server}")
     headers = {'Content-Type': 'application/trig'}
     # NOTE: nanopub-java uses {'Content-Type': 'application/x-www-form-urlencoded'}
     data = g.serialize(format="trig")
-    r = requests.post(use_server, headers=headers, data=data.encode('utf-8'))
+    r = get_transport(transport).post(use_server, headers=headers, data=data.encode('utf-8'))
     r.raise_for_status()
     return True
 
 
+@lru_cache(maxsize=PUBLIC_KEY_CACHE_SIZE)
+def get_verifier(public_key: str):
+    """Get the PKCS#1 v1.5 verifier for a public key, cached as many nanopubs are signed with the same key"""
+    return PKCS1_v1_5.new(RSA.import_key(decodebytes(public_key.encode())))
+
+
 def verify_trusty(g: ConjunctiveGraph, source_uri: str, source_namespace: Namespace) -> bool:
     """Verify Trusty URI in a nanopub Graph"""
     source_trusty = source_uri.split('/')[-1]
@@ -147,20 +156,60 @@ def verify_signature(g: ConjunctiveGraph, source_namespace: Namespace) -> bool:
     if not np_sig.signature:
         raise MalformedNanopubError("No Signature found in the nanopublication RDF")
 
-    # Normalize RDF
-    quads = RdfUtils.get_quads(g)
-    normed_rdf = RdfHasher.normalize_quads(
-        quads,
-        baseuri=str(source_namespace),
-        hashstr=" "
-    )
-
     # Verify signature using the normalized RDF
-    key = RSA.import_key(decodebytes(str(np_sig.public_key).encode()))
-    hash_value = SHA256.new(normed_rdf.encode())
-    verifier = PKCS1_v1_5.new(key)
+    quads = RdfUtils.get_quads(g)
+    verifier = get_verifier(str(np_sig.public_key))
+    hash_value = RdfHasher.update_hash(SHA256.new(), quads, baseuri=str(source_namespace), hashstr=" ")
     try:
         verifier.verify(hash_value, decodebytes(np_sig.signature.encode()))
         return True
     except Exception as e:
         raise MalformedNanopubError(e)
+
+
+def verify_nanopub(g: ConjunctiveGraph, np_meta: NanopubMetadata = None) -> NanopubVerification:
+    """Verify the RSA signature and the Trusty URI of a nanopub Graph from a single normalization of its RDF.
+
+    Failures are reported in the returned NanopubVerification instead of being raised."""
+    result = NanopubVerification()
+    if np_meta is None:
+        try:
+            np_meta = extract_np_metadata(g)
+        except MalformedNanopubError as e:
+            result.errors.append(str(e))
+            return result
+    result.np_uri = np_meta.np_uri
+    result.trusty = np_meta.trusty
+
+    # The trusty artefact is replaced by a blank in the normalized RDF, as it was when the nanopub was signed
+    quads = RdfUtils.get_quads(g)
+    sorted_quads = RdfHasher.sort_quads(quads, hashstr=np_meta.trusty)
+
+    if np_meta.trusty:
+        result.expected_trusty = RdfHasher.make_sorted_hash(sorted_quads)
+        result.valid_trusty = result.expected_trusty == np_meta.trusty
+        if not result.valid_trusty:
+            result.errors.append(f"The Trusty artefact of the nanopub {np_meta.trusty} is not valid. It should be {result.expected_trusty}")
+    else:
+        result.errors.append(f"No Trusty artefact found in the nanopub URI {np_meta.np_uri}")
+
+    if not np_meta.signature:
+        result.errors.append("No Signature found in the nanopublication RDF")
+    elif np_meta.algorithm is not None and str(np_meta.algorithm) != "RSA":
+        result.errors.append(f"Unsupported signature algorithm: {np_meta.algorithm}")
+    else:
+        # The signature covers all the triples, except the one holding the signature
+        signature_triple = preprocess(
+            [(np_meta.pubinfo, np_meta.sig_uri, NPX["hasSignature"], None)],
+            hashstr=np_meta.trusty
+        )[0][:3]
+        signed_quads = [q for q in sorted_quads if q[:3] != signature_triple]
+        hash_value = RdfHasher.update_sorted_hash(SHA256.new(), signed_quads)
+        try:
+            result.valid_signature = get_verifier(str(np_meta.public_key)).verify(hash_value, decodebytes(str(np_meta.signature).encode()))
+        except (ValueError, TypeError, IndexError) as e:
+            result.errors.append(f"Could not verify the signature: {e}")
+        else:
+            if not result.valid_signature:
+                result.errors.append("The signature of the nanopub does not match its content")
+    return result
@@ -0,0 +1,97 @@
+"""
+This module includes the HTTP transport shared by the nanopub clients, with connection pooling.
+"""
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from nanopub.definitions import HTTP_CONNECT_TIMEOUT, HTTP_POOL_SIZE
+
+
+class HttpTransport:
+    """HTTP session with connection pooling and keep-alive, shared by all the requests to the nanopub servers.
+
+    Reusing the connections saves a TCP and TLS handshake per request. A transport is shared and
+    not copied when the NanopubConf holding it is copied.
+
+    Args:
+        pool_connections (int): Number of hosts for which connections are kept
+        pool_maxsize (int): Number of connections kept open to each host
+        host_pool_sizes (dict): Number of connections kept open for specific hosts or URL prefixes,
+            e.g. {"https://query.knowledgepixels.com/": 32}
+        timeout: Default timeout of the requests in seconds, as a float or a (connect, read) tuple.
+            None to wait forever
+        max_retries (int): Number of retries of failed connections
+        session (requests.Session): Use this session instead of creating a new one
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = HTTP_POOL_SIZE,
+        pool_maxsize: int = HTTP_POOL_SIZE,
+        host_pool_sizes: Optional[Dict[str, int]] = None,
+        timeout=(HTTP_CONNECT_TIMEOUT, None),
+        max_retries: int = 0,
+        session: Optional[requests.Session] = None,
+    ):
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=max_retries)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        for prefix, size in (host_pool_sizes or {}).items():
+            if "://" not in prefix:
+                prefix = f"https://{prefix}/"
+            # requests uses the adapter of the longest matching prefix
+            session.mount(prefix, HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=max_retries))
+        self.session = session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+_default_transport: Optional[HttpTransport] = None
+_default_transport_lock = threading.Lock()
+
+
+def get_transport(transport: Optional[HttpTransport] = None) -> HttpTransport:
+    """Return the given transport, or the default transport shared by the whole process"""
+    global _default_transport
+    if transport is not None:
+        return transport
+    if _default_transport is None:
+        with _default_transport_lock:
+            if _default_transport is None:
+                _default_transport = HttpTransport()
+    return _default_transport
+
+
+def set_default_transport(transport: Optional[HttpTransport]) -> None:
+    """Replace the transport used when none is given, None to create a new one with the default settings"""
+    global _default_transport
+    _default_transport = transport
@@ -0,0 +1,124 @@
+"""Check the trusty hashes of many files and URLs in parallel, and write a JSON or CSV report.
+
+Inputs can be files, directories (searched recursively for files with a trusty hash in their name),
+glob patterns, URLs, or @list files with one input per line:
+
+    python -m nanopub.trustyuri.CheckBatch --workers 8 --format csv --output report.csv archive/ @urls.txt
+"""
+import argparse
+import csv
+import glob
+import json
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from nanopub.transport import HttpTransport
+from nanopub.trustyuri import CheckFile, ModuleDirectory, TrustyUriUtils
+
+REPORT_FIELDS = ["location", "hashstr", "module", "correct", "error", "seconds"]
+
+# Connections kept open to each host by the HTTP session of a worker
+HTTP_POOL_SIZE = 16
+
+# One HTTP session per worker process, created by _init_worker()
+_session = None
+
+
+def check_batch(inputs, workers=None, chunksize=16):
+    """Check the hash of every file and URL of the inputs, with a pool of worker processes.
+
+    Returns the results in the order of the inputs: dicts with the REPORT_FIELDS keys.
+    With workers=1 everything is checked in the current process"""
+    locations = list(expand_inputs(inputs))
+    if workers == 1:
+        _init_worker()
+        return [check_location(location) for location in locations]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        return list(executor.map(check_location, locations, chunksize=chunksize))
+
+
+def check_location(location):
+    """Check the hash of one file or URL, errors are recorded in the result instead of being raised"""
+    tail = TrustyUriUtils.get_trustyuri_tail(location)
+    result = {"location": location, "hashstr": tail, "module": tail[:2], "correct": None, "error": None}
+    start = time.perf_counter()
+    try:
+        result["correct"] = CheckFile.has_correct_hash(location, _session)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - start, 6)
+    return result
+
+
+def expand_inputs(inputs):
+    """Generate the files and URLs to check from files, directories, glob patterns, URLs and @list files"""
+    for item in inputs:
+        if item.startswith("@"):
+            with open(item[1:], encoding="utf-8") as f:
+                yield from expand_inputs(line.strip() for line in f if line.strip() and not line.startswith("#"))
+        elif re.match(r"^[a-zA-Z][a-zA-Z0-9+.-]*://", item):
+            yield item
+        elif os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                for name in sorted(files):
+                    if _has_known_module(name):
+                        yield os.path.join(root, name)
+        elif glob.has_magic(item):
+            yield from sorted(glob.glob(item, recursive=True))
+        else:
+            yield item
+
+
+def write_report(results, out, report_format="json"):
+    """Write the results of check_batch() to a text file object, as "json" or "csv" """
+    if report_format == "json":
+        json.dump(results, out, indent=2)
+        out.write("\n")
+    elif report_format == "csv":
+        writer = csv.DictWriter(out, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+    else:
+        raise ValueError(f"Unknown report format: {report_format}")
+
+
+def main(args):
+    parser = argparse.ArgumentParser(
+        prog="python -m nanopub.trustyuri.CheckBatch",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("inputs", nargs="+", help="Files, directories, glob patterns, URLs, or @list files")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes, default: CPU count")
+    parser.add_argument("--format", choices=["json", "csv"], default="json", help="Report format")
+    parser.add_argument("--output", default=None, help="Report file, default: standard output")
+    options = parser.parse_args(args)
+
+    results = check_batch(options.inputs, workers=options.workers)
+    if options.output is None:
+        write_report(results, sys.stdout, options.format)
+    else:
+        with open(options.output, "w", encoding="utf-8", newline="") as out:
+            write_report(results, out, options.format)
+    failed = sum(1 for r in results if not r["correct"])
+    print(f"Checked {len(results)}, correct: {len(results) - failed}, incorrect or failed: {failed}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def _has_known_module(filename):
+    return TrustyUriUtils.get_trustyuri_tail(filename)[:2] in ModuleDirectory.modules
+
+
+def _init_worker():
+    global _session
+    _session = HttpTransport(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE).session
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(main(sys.argv[1:]))
@@ -1,6 +1,6 @@
-import codecs
 import logging
 import sys
+from contextlib import contextmanager
 
 from nanopub.trustyuri import ModuleDirectory, TrustyUriUtils
 from nanopub.trustyuri.TrustyUriResource import TrustyUriResource
@@ -12,20 +12,46 @@ except Exception:
 
 
 def check(args):
+    """Check the trusty hash of a file or URL, print the result and return whether the hash is correct"""
     filename = args[0]
 
     tail = TrustyUriUtils.get_trustyuri_tail(filename)
-    module_id = tail[:2]
-    module = ModuleDirectory.get_module(module_id)
-    try:
-        content = codecs.open(filename, 'r', 'utf-8').read()
-    except Exception:
-        content = urlopen(filename).read()
-    resource = TrustyUriResource(filename, content, tail)
-    if module.has_correct_hash(resource):
+    correct = has_correct_hash(filename)
+    if correct:
         print("Correct hash: " + tail)
     else:
         print("*** INCORRECT HASH ***")
+    return correct
+
+
+def has_correct_hash(filename, session=None):
+    """Check the trusty hash of a file or URL, URLs are downloaded with the requests session if one is given"""
+    tail = TrustyUriUtils.get_trustyuri_tail(filename)
+    module = ModuleDirectory.get_module(tail[:2])
+    with open_content(filename, session) as content:
+        return module.has_correct_hash(TrustyUriResource(filename, content, tail))
+
+
+@contextmanager
+def open_content(filename, session=None):
+    """Open a file or URL as a binary stream: the FA module hashes it by chunks"""
+    try:
+        f = open(filename, 'rb')
+    except Exception:
+        if session is not None and "://" not in filename:
+            raise
+        f = None
+    if f is not None:
+        with f:
+            yield f
+    elif session is None:
+        with urlopen(filename) as response:
+            yield response
+    else:
+        with session.get(filename, stream=True) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            yield response.raw
 
 
 if __name__ == "__main__":
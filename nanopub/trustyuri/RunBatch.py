@@ -1,38 +1,196 @@
+"""Run and time the trusty URI commands of a batch script, one command per line:
+
+    # Comment
+    CheckFile path/to/file.FA...
+    ProcessFile path/to/file
+    TransformRdf path/to/file.trig http://example.org/base/
+
+Each command can be run several times, after warm-up runs. The runs of read-only commands (CheckFile)
+can be spread across worker processes, the runs of the commands writing files are always done one
+after the other. A run fails if the command raises an error, or if CheckFile finds an incorrect hash.
+The min, median and 95th percentile of the timings are reported as text, JSON or CSV:
+
+    python -m nanopub.trustyuri.RunBatch --sandbox tests/testsuite --warmup 2 --repeat 20 --format json \\
+        scripts/benchmark_trusty.batch
+
+Commands must give the same result when they are repeated: ProcessFile renames its file,
+run it only once, or in a --sandbox copy of the files.
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
 import logging
+import math
+import os
 import re
+import shutil
+import statistics
 import sys
+import tempfile
 import time
+from concurrent.futures import ProcessPoolExecutor
 
 from nanopub.trustyuri.file import ProcessFile
 from nanopub.trustyuri.rdf import TransformRdf
 
 from . import CheckFile
 
-logging.basicConfig(level=logging.ERROR)
+COMMANDS = {
+    "CheckFile": CheckFile.check,
+    "ProcessFile": ProcessFile.process,
+    "TransformRdf": TransformRdf.transform,
+}
+
+# Commands that do not write files, their runs can be done in parallel
+READ_ONLY_COMMANDS = {"CheckFile"}
+
+REPORT_FIELDS = ["command", "runs", "errors", "min", "median", "p95"]
 
-filename = sys.argv[1]
 
-with open(filename) as f:
-    for line in f:
-        line = line.strip()
-        if (re.match(r'^#|^$', line)):
-            continue
-        print("COMMAND: " + line)
-        cmdargs = line.split(' ')
-        cmd = cmdargs.pop(0)
-        starttime = time.time()
+def read_commands(filename):
+    """Read the command lines of a batch script, skipping comments and empty lines"""
+    commands = []
+    with open(filename) as f:
+        for line in f:
+            line = line.strip()
+            if (re.match(r'^#|^$', line)):
+                continue
+            cmd = line.split(' ')[0]
+            if cmd not in COMMANDS:
+                raise ValueError("Unrecognized command %s" % cmd)
+            commands.append(line)
+    return commands
+
+
+def run_command(line, quiet=False):
+    """Run one command line, and return its time in seconds and its error (None if it succeeded).
+    A command returning False failed, e.g. CheckFile with an incorrect hash. With quiet, what the
+    command prints is discarded"""
+    cmdargs = line.split(' ')
+    cmd = cmdargs.pop(0)
+    error = None
+    with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+        starttime = time.perf_counter()
         try:
-            if (cmd == "CheckFile"):
-                CheckFile.check(cmdargs)
-            elif (cmd == "ProcessFile"):
-                ProcessFile.process(cmdargs)
-            elif (cmd == "TransformRdf"):
-                TransformRdf.transform(cmdargs)
-            else:
-                print("ERROR: Unrecognized command %s" % cmd)
-                exit(1)
+            if COMMANDS[cmd](cmdargs) is False:
+                error = "%s failed" % cmd
         except Exception:
-            print(sys.exc_info()[0])
-        t = time.time() - starttime
-        print("Time in seconds: %g" % t)
-        print("---")
+            error = str(sys.exc_info()[0])
+        t = time.perf_counter() - starttime
+    return t, error
+
+
+def run_batch(commands, repeat=1, warmup=0, workers=1, quiet=False, on_result=None):
+    """Time each command repeat times after warmup untimed runs, with a pool of worker processes if workers > 1.
+    Only the runs of the READ_ONLY_COMMANDS are done in parallel: the runs of the other commands would write
+    the same files at the same time.
+
+    Returns a summary per command (see summarize()), on_result is called with each summary when it is ready"""
+    results = []
+    with contextlib.ExitStack() as stack:
+        executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers)) if workers > 1 else None
+        for line in commands:
+            if not quiet:
+                print("COMMAND: " + line)
+            parallel = executor is not None and line.split(' ')[0] in READ_ONLY_COMMANDS
+            map_runs = executor.map if parallel else map
+            runs = list(map_runs(run_command, [line] * (warmup + repeat), [quiet] * (warmup + repeat)))[warmup:]
+            errors = [error for _t, error in runs if error is not None]
+            if not quiet:
+                for error in errors:
+                    print(error)
+            result = summarize(line, [t for t, _error in runs], len(errors))
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+    return results
+
+
+def summarize(command, times, errors=0):
+    times = sorted(times)
+    return {
+        "command": command,
+        "runs": len(times),
+        "errors": errors,
+        "min": times[0],
+        "median": statistics.median(times),
+        "p95": percentile(times, 95),
+    }
+
+
+def percentile(sorted_times, p):
+    """Nearest-rank percentile of sorted values"""
+    return sorted_times[max(0, math.ceil(p / 100 * len(sorted_times)) - 1)]
+
+
+def print_text_result(result):
+    if result["runs"] == 1:
+        print("Time in seconds: %g" % result["min"])
+    else:
+        print("Time in seconds: min %g, median %g, p95 %g (%d runs)" % (
+            result["min"], result["median"], result["p95"], result["runs"]
+        ))
+    print("---")
+
+
+def write_report(results, out, report_format="json"):
+    """Write the results of run_batch() to a text file object, as "json" or "csv" """
+    if report_format == "json":
+        json.dump(results, out, indent=2)
+        out.write("\n")
+    elif report_format == "csv":
+        writer = csv.DictWriter(out, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+    else:
+        raise ValueError(f"Unknown report format: {report_format}")
+
+
+def main(args):
+    parser = argparse.ArgumentParser(
+        prog="python -m nanopub.trustyuri.RunBatch",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("script", help="Batch script with one command per line")
+    parser.add_argument("--repeat", type=int, default=1, help="Timed runs of each command")
+    parser.add_argument("--warmup", type=int, default=0, help="Untimed runs of each command before the timed ones")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes running the runs of a read-only command")
+    parser.add_argument("--format", choices=["text", "json", "csv"], default="text", help="Report format")
+    parser.add_argument("--output", default=None, help="Report file for json and csv, default: standard output")
+    parser.add_argument("--sandbox", default=None,
+                        help="Directory copied to a temporary directory the commands are run in")
+    options = parser.parse_args(args)
+
+    try:
+        commands = read_commands(options.script)
+    except ValueError as e:
+        print("ERROR: %s" % e)
+        return 1
+    text = options.format == "text"
+    with contextlib.ExitStack() as stack:
+        if options.sandbox is not None:
+            tmpdir = stack.enter_context(tempfile.TemporaryDirectory(prefix="trustyuri-batch-"))
+            sandbox = os.path.join(tmpdir, "sandbox")
+            shutil.copytree(options.sandbox, sandbox)
+            cwd = os.getcwd()
+            os.chdir(sandbox)
+            stack.callback(os.chdir, cwd)
+        results = run_batch(
+            commands, repeat=options.repeat, warmup=options.warmup, workers=options.workers,
+            quiet=not text, on_result=print_text_result if text else None,
+        )
+    if not text:
+        if options.output is None:
+            write_report(results, sys.stdout, options.format)
+        else:
+            with open(options.output, "w", encoding="utf-8", newline="") as out:
+                write_report(results, out, options.format)
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.ERROR)
+    sys.exit(main(sys.argv[1:]))
@@ -2,9 +2,39 @@ import hashlib
 
 from nanopub.trustyuri import TrustyUriUtils
 
+# Size of the chunks read from files and streams to hash them
+CHUNK_SIZE = 1024 * 1024
+
 
 def make_hash(content):
+    """Compute the FA hash of content given as bytes, str (hashed as UTF-8), or a binary file object read in chunks"""
+    if hasattr(content, "read"):
+        return make_stream_hash(content)
     try:
         return "FA" + TrustyUriUtils.get_base64(hashlib.sha256(content).digest())
     except Exception:
         return "FA" + TrustyUriUtils.get_base64(hashlib.sha256(content.encode()).digest())
+
+
+def make_file_hash(filename, chunk_size=CHUNK_SIZE):
+    """Compute the FA hash of the bytes of a file, without loading it in memory"""
+    with open(filename, "rb") as f:
+        return make_stream_hash(f, chunk_size)
+
+
+def make_stream_hash(stream, chunk_size=CHUNK_SIZE):
+    """Compute the FA hash of a binary file object, read until its end by chunks of chunk_size bytes"""
+    h = hashlib.sha256()
+    if hasattr(stream, "readinto"):
+        # Reuse the same buffer for every chunk
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        while True:
+            n = stream.readinto(buffer)
+            if not n:
+                break
+            h.update(view[:n])
+    else:
+        for chunk in iter(lambda: stream.read(chunk_size), b""):
+            h.update(chunk)
+    return "FA" + TrustyUriUtils.get_base64(h.digest())
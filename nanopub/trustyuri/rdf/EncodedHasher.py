@@ -0,0 +1,118 @@
+"""Same normalization and hash as RdfHasher, for large sets of quads.
+
+Each distinct term is encoded to an integer once, ranked in the StatementComparator order,
+and the quads are sorted on these integer columns instead of comparing the sort keys of every quad.
+The sort is done with numpy.lexsort when numpy is installed (pip install "nanopub[fast]"),
+and by sorting Python ints otherwise.
+"""
+import hashlib
+
+from rdflib.term import Literal
+
+from nanopub.trustyuri import TrustyUriUtils
+from nanopub.trustyuri.rdf.RdfHasher import value_to_string
+from nanopub.trustyuri.rdf.RdfPreprocessor import preprocess
+from nanopub.trustyuri.rdf.StatementComparator import StatementComparator
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def make_hash(quads, hashstr=None, baseuri=None) -> str:
+    """Same as RdfHasher.make_hash()"""
+    return make_hash_and_sort(quads, hashstr, baseuri)[0]
+
+
+def make_hash_and_sort(quads, hashstr=None, baseuri=None) -> tuple:
+    """Compute the hash like make_hash(), and return it with the preprocessed quads
+    in the order used for normalization, like RdfHasher.sort_quads() returns them"""
+    quads, order, columns = _encode_quads(quads, hashstr, baseuri)
+    h = hashlib.sha256()
+    for e in _iter_statements(order, columns):
+        h.update(e.encode('utf-8'))
+    return "RA" + TrustyUriUtils.get_base64(h.digest()), [quads[i] for i in order]
+
+
+def update_hash(h, quads, hashstr=None, baseuri=None):
+    """Same as RdfHasher.update_hash()"""
+    for e in iter_normalized_quads(quads, hashstr, baseuri):
+        h.update(e.encode('utf-8'))
+    return h
+
+
+def iter_normalized_quads(quads, hashstr=None, baseuri=None):
+    """Same as RdfHasher.iter_normalized_quads()"""
+    _quads, order, columns = _encode_quads(quads, hashstr, baseuri)
+    return _iter_statements(order, columns)
+
+
+def _encode_quads(quads, hashstr, baseuri):
+    """Preprocess and encode the quads, returns the preprocessed quads, the indexes of the quads in sorted order,
+    and the (terms, codes) of each column"""
+    quads.sort()
+    quads = preprocess(quads, hashstr=hashstr, baseuri=baseuri)
+    comp = StatementComparator(hashstr)
+
+    def context_key(c):
+        return (0,) if c is None else (1, comp.uri_key(c))
+
+    def object_key(o):
+        return (1, comp.literal_key(o[0])) if isinstance(o, tuple) else (0, comp.uri_key(o))
+
+    # Literals equal for rdflib can still differ by the case of their language tag, which is part of the sort key
+    objects = [(o, o.language) if isinstance(o, Literal) else o for _c, _s, _p, o in quads]
+    columns = [
+        _encode_column([q[0] for q in quads], context_key),
+        _encode_column([q[1] for q in quads], comp.uri_key),
+        _encode_column([q[2] for q in quads], comp.uri_key),
+        _encode_column(objects, object_key),
+    ]
+    order = sort_order([ranks for _terms, _codes, ranks in columns])
+    return quads, order, [(terms, codes) for terms, codes, _ranks in columns]
+
+
+def _iter_statements(order, columns):
+    (c_terms, c_codes), (s_terms, s_codes), (p_terms, p_codes), (o_terms, o_codes) = columns
+    c_lines = [value_to_string(t) for t in c_terms]
+    s_lines = [value_to_string(t) for t in s_terms]
+    p_lines = [value_to_string(t) for t in p_terms]
+    o_lines = [value_to_string(t[0] if isinstance(t, tuple) else t) for t in o_terms]
+
+    previous = ""
+    for i in order:
+        e = c_lines[c_codes[i]] + s_lines[s_codes[i]] + p_lines[p_codes[i]] + o_lines[o_codes[i]]
+        if not e == previous:
+            yield e
+        previous = e
+
+
+def sort_order(columns) -> list:
+    """Indexes of the rows sorted by the integer columns: first by the first column, then the second...
+    The sort is stable, rows with the same values keep their order"""
+    if not columns or not columns[0]:
+        return []
+    if numpy is not None:
+        # lexsort() sorts by the last key first
+        return numpy.lexsort([numpy.asarray(col, dtype=numpy.int64) for col in reversed(columns)]).tolist()
+    # Combine the ranks in a single int per row, Python compares ints much faster than tuples
+    keys = columns[0]
+    for col in columns[1:]:
+        size = max(col) + 1
+        keys = [k * size + r for k, r in zip(keys, col)]
+    return sorted(range(len(keys)), key=keys.__getitem__)
+
+
+def _encode_column(values, sort_key):
+    """Encode the terms of a column to integers.
+
+    Returns the distinct terms, the index of the term of each row in the distinct terms,
+    and the rank of the term of each row: terms with the same sort key have the same rank"""
+    ids: dict = {}
+    codes = [ids.setdefault(v, len(ids)) for v in values]
+    terms = list(ids)
+    keys = [sort_key(t) for t in terms]
+    rank_by_key = {k: r for r, k in enumerate(sorted(set(keys)))}
+    term_ranks = [rank_by_key[k] for k in keys]
+    return terms, codes, [term_ranks[c] for c in codes]
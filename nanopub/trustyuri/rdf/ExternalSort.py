@@ -0,0 +1,105 @@
+"""External merge sort of (key, value) byte records, for data that does not fit in memory.
+
+Records are sorted in memory by runs, spilled to temporary files, then merged back in a single stream.
+"""
+import heapq
+import os
+import struct
+import tempfile
+
+# Maximum number of run files merged at once, more runs are first merged into bigger runs
+MERGE_FAN_IN = 128
+
+_record_header = struct.Struct(">II")
+
+
+def encode_key(key) -> bytes:
+    """Encode a sort key made of nested tuples of small ints, str and bytes, into bytes that sort
+    in the same order as the key when compared with the plain bytes order"""
+    if isinstance(key, tuple):
+        return b"".join(encode_key(k) for k in key)
+    if isinstance(key, int):
+        return bytes([key])
+    if isinstance(key, str):
+        key = key.encode('utf-8')
+    return encode_bytes(key)
+
+
+def encode_bytes(b: bytes) -> bytes:
+    """Encode a bytes field of a sort key, so that the concatenation of the fields sorts like the tuple of fields"""
+    # Escape the 0 bytes, and end with a separator lower than any escaped content: a prefix sorts first
+    return b.replace(b"\x00", b"\x00\xff") + b"\x00\x00"
+
+
+class ExternalSorter:
+    """Sort records by key with a bounded number of records in memory.
+
+    Use as a context manager to remove the temporary files at the end:
+
+        with ExternalSorter(run_size=100000) as sorter:
+            for key, value in records:
+                sorter.add(key, value)
+            for key, value in sorter.sorted():
+                ...
+    """
+
+    def __init__(self, run_size: int = 100000, tmpdir: str = None, fan_in: int = MERGE_FAN_IN):
+        self.run_size = run_size
+        self.fan_in = fan_in
+        self._tmpdir = tempfile.TemporaryDirectory(prefix="trustyuri-sort-", dir=tmpdir)
+        self._runs: list = []
+        self._buffer: list = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self) -> None:
+        self._tmpdir.cleanup()
+
+    def add(self, key: bytes, value: bytes) -> None:
+        self._buffer.append((key, value))
+        if len(self._buffer) >= self.run_size:
+            self._spill()
+
+    def sorted(self):
+        """Generate all the records added, sorted by key then value"""
+        if not self._runs:
+            # Everything fits in one run: no need to go through the disk
+            self._buffer.sort()
+            yield from self._buffer
+            return
+        self._spill()
+        while len(self._runs) > self.fan_in:
+            runs, self._runs = self._runs[:self.fan_in], self._runs[self.fan_in:]
+            self._runs.append(self._write_run(heapq.merge(*[_read_run(run) for run in runs])))
+            for run in runs:
+                os.remove(run)
+        yield from heapq.merge(*[_read_run(run) for run in self._runs])
+
+    def _spill(self) -> None:
+        if self._buffer:
+            self._buffer.sort()
+            self._runs.append(self._write_run(self._buffer))
+            self._buffer = []
+
+    def _write_run(self, records) -> str:
+        fd, path = tempfile.mkstemp(suffix=".run", dir=self._tmpdir.name)
+        with os.fdopen(fd, "wb") as f:
+            for key, value in records:
+                f.write(_record_header.pack(len(key), len(value)))
+                f.write(key)
+                f.write(value)
+        return path
+
+
+def _read_run(path: str):
+    with open(path, "rb", buffering=1024 * 1024) as f:
+        while True:
+            header = f.read(_record_header.size)
+            if not header:
+                return
+            key_len, value_len = _record_header.unpack(header)
+            yield f.read(key_len), f.read(value_len)
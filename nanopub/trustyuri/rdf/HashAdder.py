@@ -1,6 +1,6 @@
 import re
 
-from rdflib.term import URIRef
+from rdflib.term import Literal, URIRef
 
 
 def addhash(quads, hashstr):
@@ -10,7 +10,8 @@ def addhash(quads, hashstr):
         s = transform(q[1], hashstr)
         p = transform(q[2], hashstr)
         o = q[3]
-        if isinstance(q[3], URIRef):
+        # Preprocessed URIs are plain str, only literals are kept as they are
+        if not isinstance(q[3], Literal):
             o = transform(q[3], hashstr)
         newquads.append((c, s, p, o))
     return newquads
@@ -0,0 +1,275 @@
+"""Read N-Quads and the subset of TriG used by nanopubs straight into quads of rdflib terms,
+without loading them in a rdflib store.
+
+Terms are built the same way rdflib parsers build them, so the quads give the same hash as the
+quads of a parsed ConjunctiveGraph. Anything outside of the supported subset (blank nodes, collections,
+relative IRIs, escapes in IRIs...) raises UnsupportedSyntaxError,
+the caller should then fall back to parsing with rdflib.
+"""
+import re
+from decimal import Decimal
+
+from rdflib.compat import decodeUnicodeEscape
+from rdflib.namespace import RDF, XSD
+from rdflib.term import Literal, URIRef
+
+
+class UnsupportedSyntaxError(ValueError):
+    """The content uses syntax that is not handled by the quad parser"""
+
+
+_token_pattern = re.compile(
+    r'''(?P<ws>(?:\s|\#[^\n]*)+)
+    |<(?P<iri>[^<>"{}|^`\\\x00-\x20]*)>
+    |"""(?P<long_dq>(?:[^"\\]|\\[\s\S]|"(?!""))*"{0,2})"""
+    |\'\'\'(?P<long_sq>(?:[^'\\]|\\[\s\S]|'(?!''))*'{0,2})\'\'\'
+    |"(?P<dq>(?:[^"\\\n\r]|\\.)*)"
+    |'(?P<sq>(?:[^'\\\n\r]|\\.)*)'
+    |@(?P<directive>prefix|base)(?![\w-])
+    |@(?P<lang>[a-zA-Z0-9]+(?:-[a-zA-Z0-9]+)*)
+    |(?P<datatype>\^\^)
+    |(?P<double>[-+]?(?:[0-9]+\.[0-9]*|\.[0-9]+|[0-9]+)[eE][-+]?[0-9]+)
+    |(?P<decimal>[-+]?[0-9]*\.[0-9]+)
+    |(?P<integer>[-+]?[0-9]+)
+    |(?P<pname>(?:[A-Za-z][\w.-]*)?:(?:[\w:%-]|\\[_~.\-!$&'()*+,;=/?\#@%]|\.(?=[\w:%\\-]))*)
+    |(?P<keyword>(?i:prefix|base|graph)|a|true|false)(?![\w:-])
+    |(?P<punct>[{}.;,])
+    ''',
+    re.VERBOSE,
+)
+
+_iri = r'<([^<>"{}|^`\\\x00-\x20]*)>'
+_nquads_line_pattern = re.compile(
+    rf'[ \t]*{_iri}[ \t]*{_iri}[ \t]*'
+    rf'(?:{_iri}|"((?:[^"\\\n\r]|\\.)*)"(?:@([a-zA-Z0-9]+(?:-[a-zA-Z0-9]+)*)|\^\^{_iri})?)'
+    rf'[ \t]*(?:{_iri}[ \t]*)?\.[ \t]*$'
+)
+
+# N-Quads lines only end with \r or \n: str.splitlines() also splits on characters allowed in literals, e.g. U+2028
+_line_end_pattern = re.compile(r"[\r\n]+")
+
+_string_groups = ("long_dq", "long_sq", "dq", "sq")
+_local_escape_pattern = re.compile(r"\\(.)")
+
+
+def parse_quads(content, rdf_format):
+    """Parse N-Quads or TriG content (str or UTF-8 bytes) to a list of (context, subject, predicate, object)
+    quads, with None as context for the default graph"""
+    if isinstance(content, bytes):
+        content = content.decode('utf-8')
+    if rdf_format == "nquads":
+        return _NQuadsParser(content).parse()
+    if rdf_format == "trig":
+        return _TrigParser(content).parse()
+    raise UnsupportedSyntaxError(f"Format not supported by the quad parser: {rdf_format}")
+
+
+def _tokenize(content):
+    tokens = []
+    pos = 0
+    length = len(content)
+    while pos < length:
+        m = _token_pattern.match(content, pos)
+        if m is None:
+            raise UnsupportedSyntaxError(f"Unsupported syntax at character {pos}: {content[pos:pos + 20]!r}")
+        pos = m.end()
+        kind = m.lastgroup
+        if kind == "ws":
+            continue
+        if kind in _string_groups:
+            tokens.append(("string", decodeUnicodeEscape(m.group(kind))))
+        else:
+            tokens.append((kind, m.group(kind)))
+    tokens.append(("eof", None))
+    return tokens
+
+
+def _absolute_iri(iri):
+    # Same test as rdflib for an IRI that does not need to be resolved against the base IRI
+    slash = iri.find("/")
+    colon = iri.find(":")
+    if colon < 0 or (0 <= slash < colon):
+        raise UnsupportedSyntaxError(f"Relative IRI: <{iri}>")
+    return iri
+
+
+class _Parser:
+    def __init__(self, content):
+        self.tokens = _tokenize(content)
+        self.pos = 0
+        self.quads = []
+
+    def peek(self):
+        return self.tokens[self.pos]
+
+    def next(self):
+        token = self.tokens[self.pos]
+        if token[0] != "eof":
+            self.pos += 1
+        return token
+
+    def expect(self, kind, value=None):
+        token = self.next()
+        if token[0] != kind or (value is not None and token[1] != value):
+            raise UnsupportedSyntaxError(f"Expected {value or kind}, found {token[1]!r}")
+        return token
+
+    def term(self, token):
+        kind, value = token
+        if kind == "iri":
+            return URIRef(_absolute_iri(value))
+        raise UnsupportedSyntaxError(f"Expected an IRI, found {value!r}")
+
+    def literal(self, value):
+        if self.peek()[0] == "lang":
+            return Literal(value, lang=self.next()[1])
+        if self.peek()[0] == "datatype":
+            self.next()
+            return Literal(value, datatype=self.term(self.next()))
+        return Literal(value)
+
+
+class _NQuadsParser:
+    """Parse the N-Quads content line by line, with a single regex for the common lines"""
+
+    def __init__(self, content):
+        self.content = content
+        # IRIs are repeated in many lines: create their URIRef only once
+        self._iris: dict = {}
+
+    def parse(self):
+        quads = []
+        for line in _line_end_pattern.split(self.content):
+            m = _nquads_line_pattern.match(line)
+            if m is None:
+                # Comments, empty lines, and the syntax not covered by the regex
+                quads.extend(_NQuadsTokensParser(line).parse())
+                continue
+            s, p, o_iri, o_value, lang, datatype, c = m.groups()
+            if o_iri is not None:
+                o = self.iri(o_iri)
+            elif lang is not None:
+                o = Literal(decodeUnicodeEscape(o_value), lang=lang)
+            elif datatype is not None:
+                o = Literal(decodeUnicodeEscape(o_value), datatype=self.iri(datatype))
+            else:
+                o = Literal(decodeUnicodeEscape(o_value))
+            quads.append((None if c is None else self.iri(c), self.iri(s), self.iri(p), o))
+        return quads
+
+    def iri(self, value):
+        uri = self._iris.get(value)
+        if uri is None:
+            uri = URIRef(_absolute_iri(value))
+            self._iris[value] = uri
+        return uri
+
+
+class _NQuadsTokensParser(_Parser):
+    def parse(self):
+        while self.peek()[0] != "eof":
+            s = self.term(self.next())
+            p = self.term(self.next())
+            token = self.next()
+            o = self.literal(token[1]) if token[0] == "string" else self.term(token)
+            c = None
+            if self.peek()[0] != "punct":
+                c = self.term(self.next())
+            self.expect("punct", ".")
+            self.quads.append((c, s, p, o))
+        return self.quads
+
+
+class _TrigParser(_Parser):
+    def __init__(self, content):
+        super().__init__(content)
+        self.prefixes: dict = {}
+
+    def parse(self):
+        while self.peek()[0] != "eof":
+            kind, value = self.peek()
+            if kind == "directive" or (kind == "keyword" and value.lower() in ("prefix", "base")):
+                self.directive()
+                continue
+            if kind == "keyword" and value.lower() == "graph":
+                self.next()
+                self.graph(self.term(self.next()))
+                continue
+            if (kind, value) == ("punct", "{"):
+                self.graph(None)
+                continue
+            subject = self.term(self.next())
+            if self.peek() == ("punct", "{"):
+                self.graph(subject)
+            else:
+                # Triples in the default graph
+                self.predicate_objects(None, subject)
+                self.expect("punct", ".")
+        return self.quads
+
+    def directive(self):
+        kind, value = self.next()
+        if value.lower() == "base":
+            raise UnsupportedSyntaxError("Base IRI declarations are not supported")
+        prefix = self.expect("pname")[1]
+        if not prefix.endswith(":") or prefix.count(":") > 1:
+            raise UnsupportedSyntaxError(f"Invalid prefix name: {prefix}")
+        self.prefixes[prefix[:-1]] = super().term(self.next())
+        if kind == "directive":
+            self.expect("punct", ".")
+
+    def graph(self, context):
+        self.expect("punct", "{")
+        while self.peek() != ("punct", "}"):
+            self.predicate_objects(context, self.term(self.next()))
+            if self.peek() == ("punct", "."):
+                self.next()
+            elif self.peek() != ("punct", "}"):
+                raise UnsupportedSyntaxError(f"Expected . or }}, found {self.peek()[1]!r}")
+        self.next()
+        if self.peek() == ("punct", "."):
+            self.next()
+
+    def predicate_objects(self, context, subject):
+        while True:
+            token = self.next()
+            predicate = RDF.type if token == ("keyword", "a") else self.term(token)
+            while True:
+                self.quads.append((context, subject, predicate, self.object(self.next())))
+                if self.peek() != ("punct", ","):
+                    break
+                self.next()
+            if self.peek() != ("punct", ";"):
+                return
+            # Repeated and trailing ; are allowed
+            while self.peek() == ("punct", ";"):
+                self.next()
+            if self.peek()[0] == "punct":
+                return
+
+    def term(self, token):
+        kind, value = token
+        if kind == "pname":
+            prefix, local = value.split(":", 1)
+            if prefix not in self.prefixes:
+                raise UnsupportedSyntaxError(f"Undefined prefix: {prefix}")
+            if "\\" in local:
+                local = _local_escape_pattern.sub(r"\1", local)
+            return URIRef(self.prefixes[prefix] + local)
+        return super().term(token)
+
+    def object(self, token):
+        kind, value = token
+        if kind == "string":
+            return self.literal(value)
+        if kind == "keyword" and value in ("true", "false"):
+            return Literal(value, datatype=XSD.boolean)
+        # Numbers are normalized like the rdflib Turtle parser does
+        if kind == "integer":
+            return Literal(str(int(value)), datatype=XSD.integer)
+        if kind == "decimal":
+            value = str(Decimal(value))
+            return Literal("0" if value == "-0" else value, datatype=XSD.decimal)
+        if kind == "double":
+            return Literal(value, datatype=XSD.double)
+        return self.term(token)
@@ -0,0 +1,90 @@
+"""Write quads of rdflib terms as N-Quads, TriG or TriX, without loading them in a rdflib store.
+
+The quads are written in the order they are given, in a single pass: give them sorted
+(e.g. by EncodedHasher.make_hash_and_sort()) to group the triples by graph and subject.
+Adjacent duplicate quads are written once. IRIs are written in full, without prefixes.
+"""
+from xml.sax.saxutils import escape, quoteattr
+
+from rdflib.term import Literal
+
+from nanopub.trustyuri.rdf.RdfUtils import to_nquads_line, to_nquads_term
+
+FORMATS = ("nquads", "trig", "trix")
+
+
+def write_quads(quads, out, rdf_format):
+    """Write (context, subject, predicate, object) quads to a text file object, None is the default graph"""
+    if rdf_format == "nquads":
+        write_nquads(quads, out)
+    elif rdf_format == "trig":
+        write_trig(quads, out)
+    elif rdf_format == "trix":
+        write_trix(quads, out)
+    else:
+        raise ValueError(f"Format not supported by the quad writer: {rdf_format}")
+
+
+def write_to_file(quads, filename, rdf_format):
+    with open(filename, "w", encoding="utf-8") as out:
+        write_quads(quads, out, rdf_format)
+
+
+def write_nquads(quads, out):
+    for q in _distinct(quads):
+        out.write(to_nquads_line(q))
+
+
+def write_trig(quads, out):
+    context = subject = predicate = _none = object()
+    for c, s, p, o in _distinct(quads):
+        if c != context:
+            if context is not _none:
+                out.write(" .\n}\n\n")
+            out.write("{\n" if c is None else f"<{c}> {{\n")
+            out.write(f"  <{s}>\n    <{p}> {to_nquads_term(o)}")
+        elif s != subject:
+            out.write(f" .\n\n  <{s}>\n    <{p}> {to_nquads_term(o)}")
+        elif p != predicate:
+            out.write(f" ;\n    <{p}> {to_nquads_term(o)}")
+        else:
+            out.write(f" ,\n      {to_nquads_term(o)}")
+        context, subject, predicate = c, s, p
+    if context is not _none:
+        out.write(" .\n}\n")
+
+
+def write_trix(quads, out):
+    out.write('<?xml version="1.0" encoding="utf-8"?>\n<TriX xmlns="http://www.w3.org/2004/03/trix/trix-1/">\n')
+    context = _none = object()
+    for c, s, p, o in _distinct(quads):
+        if c != context:
+            if context is not _none:
+                out.write("  </graph>\n")
+            out.write("  <graph>\n" if c is None else f"  <graph>\n    <uri>{escape(c)}</uri>\n")
+            context = c
+        out.write(f"    <triple>\n      <uri>{escape(s)}</uri>\n      <uri>{escape(p)}</uri>\n"
+                  f"      {_trix_object(o)}\n    </triple>\n")
+    if context is not _none:
+        out.write("  </graph>\n")
+    out.write("</TriX>\n")
+
+
+def _distinct(quads):
+    previous = None
+    for q in quads:
+        if q != previous:
+            yield q
+        previous = q
+
+
+def _trix_object(o):
+    if not isinstance(o, Literal):
+        return f"<uri>{escape(o)}</uri>"
+    # XML parsers would read a \r as \n
+    value = escape(o, {"\r": "&#13;"})
+    if o.language is not None:
+        return f"<plainLiteral xml:lang={quoteattr(o.language)}>{value}</plainLiteral>"
+    if o.datatype is not None:
+        return f"<typedLiteral datatype={quoteattr(o.datatype)}>{value}</typedLiteral>"
+    return f"<plainLiteral>{value}</plainLiteral>"
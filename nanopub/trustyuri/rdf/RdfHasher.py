@@ -1,6 +1,4 @@
 import hashlib
-import re
-from functools import cmp_to_key
 
 from rdflib.term import Literal
 
@@ -11,31 +9,79 @@ from nanopub.utils import log
 
 
 def normalize_quads(quads, hashstr=None, baseuri=None):
+    s = "".join(iter_normalized_quads(quads, hashstr, baseuri))
+    log.debug(f"Normalized quads before signing/hashing:\n{s}")
+    return s
+
+
+def iter_normalized_quads(quads, hashstr=None, baseuri=None):
+    """Generate the normalized quads one statement (4 lines) at a time, without building the whole string"""
+    return iter_sorted_statements(sort_quads(quads, hashstr, baseuri))
+
+
+def sort_quads(quads, hashstr=None, baseuri=None) -> list:
+    """Preprocess the quads and sort them in the order used for normalization"""
     quads.sort()
     quads = preprocess(quads, hashstr=hashstr, baseuri=baseuri)
     comp = StatementComparator(hashstr)
-    quads = sorted(quads, key=cmp_to_key(lambda q1, q2: comp.compare(q1, q2)))
-    s = ""
+    return sorted(quads, key=comp.sort_key)
+
+
+def insert_sorted_quad(sorted_quads: list, quad, hashstr=None, baseuri=None) -> None:
+    """Preprocess a quad and insert it in quads returned by sort_quads(), at the position it would have been sorted to.
+    The quad should not contain blank nodes, as their numbering depends on all the other quads"""
+    quad = preprocess([quad], hashstr=hashstr, baseuri=baseuri)[0]
+    comp = StatementComparator(hashstr)
+    key = comp.sort_key(quad)
+    lo, hi = 0, len(sorted_quads)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if key < comp.sort_key(sorted_quads[mid]):
+            hi = mid
+        else:
+            lo = mid + 1
+    sorted_quads.insert(lo, quad)
+
+
+def iter_sorted_statements(sorted_quads):
+    """Generate the normalized statements of quads returned by sort_quads()"""
     previous = ""
-    for q in quads:
-        e = ""
-        e = e + str(value_to_string(q[0]))
-        e = e + str(value_to_string(q[1]))
-        e = e + str(value_to_string(q[2]))
-        e = e + str(value_to_string(q[3]))
+    # Graph names and predicates repeat in almost every quad: encode each distinct term only once
+    lines: dict = {None: "\n"}
+
+    def to_string(value):
+        line = lines.get(value)
+        if line is None:
+            line = value_to_string(value)
+            lines[value] = line
+        return line
+
+    for q in sorted_quads:
+        e = to_string(q[0]) + to_string(q[1]) + to_string(q[2]) + to_string(q[3])
         if not e == previous:
-            s = s + e
+            yield e
         previous = e
-    log.debug(f"Normalized quads before signing/hashing:\n{s}")
-    return s
+
+
+def update_hash(h, quads, hashstr=None, baseuri=None):
+    """Feed the normalized quads to a hash object (hashlib or Crypto.Hash) and return it"""
+    return update_sorted_hash(h, sort_quads(quads, hashstr, baseuri))
+
+
+def update_sorted_hash(h, sorted_quads):
+    """Feed quads returned by sort_quads() to a hash object (hashlib or Crypto.Hash) and return it"""
+    for e in iter_sorted_statements(sorted_quads):
+        h.update(e.encode('utf-8'))
+    return h
 
 
 def make_hash(quads, hashstr=None, baseuri=None) -> str:
-    s = normalize_quads(quads, hashstr, baseuri)
+    return make_sorted_hash(sort_quads(quads, hashstr, baseuri))
+
 
-    # Uncomment next line to see what goes into the hash:
-    # print("NORMALIZED QUADS IN MAKE_HASH\n" + s + "NORMALIZED QUADS IN MAKE_HASH\n")
-    return "RA" + TrustyUriUtils.get_base64(hashlib.sha256(s.encode('utf-8')).digest())
+def make_sorted_hash(sorted_quads) -> str:
+    h = update_sorted_hash(hashlib.sha256(), sorted_quads)
+    return "RA" + TrustyUriUtils.get_base64(h.digest())
 
 
 def value_to_string(value) -> str:
@@ -53,4 +99,7 @@ def value_to_string(value) -> str:
 
 
 def escape(s) -> str:
-    return re.sub(r'\n', r'\\n', re.sub(r'\\', r'\\\\', str(s)))
+    s = str(s)
+    if "\\" not in s and "\n" not in s:
+        return s
+    return s.replace("\\", "\\\\").replace("\n", "\\n")
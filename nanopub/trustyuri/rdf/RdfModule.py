@@ -1,5 +1,3 @@
-from rdflib.graph import ConjunctiveGraph
-
 from nanopub.trustyuri.rdf import RdfHasher, RdfUtils
 from nanopub.trustyuri.TrustyUriModule import TrustyUriModule
 
@@ -9,8 +7,9 @@ class RdfModule(TrustyUriModule):
         return "RA"
     def has_correct_hash(self, resource):
         f = RdfUtils.get_format(resource.get_filename())
-        cg = ConjunctiveGraph()
-        cg.parse(data=resource.get_content(), format=f)
-        quads = RdfUtils.get_quads(cg)
+        content = resource.get_content()
+        if hasattr(content, "read"):
+            content = content.read()
+        quads = RdfUtils.read_quads(content, f)
         h = RdfHasher.make_hash(quads, resource.get_hashstr())
         return resource.get_hashstr() == h
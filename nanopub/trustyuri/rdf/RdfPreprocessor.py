@@ -1,18 +1,23 @@
+import re
+
 from rdflib.term import BNode, URIRef
 
+from nanopub.definitions import NP_PREFIX, NP_TEMP_PREFIX
 from nanopub.trustyuri.rdf import RdfUtils
 
+_unnamed_bnode_pattern = re.compile(r'^[a-zA-Z0-9]{33}$')
+
 
 def preprocess(quads, hashstr=None, baseuri=None):
+    context = PreprocessContext(hashstr, baseuri)
     newquads = []
-    bnodemap = {}
     for q in quads:
-        c = transform(q[0], hashstr, baseuri, bnodemap)
-        s = transform(q[1], hashstr, baseuri, bnodemap)
-        p = transform(q[2], hashstr, baseuri, bnodemap)
+        c = context.transform(q[0])
+        s = context.transform(q[1])
+        p = context.transform(q[2])
         o = q[3]
         if isinstance(q[3], URIRef) or isinstance(q[3], BNode):
-            o = transform(q[3], hashstr, baseuri, bnodemap)
+            o = context.transform(q[3])
         newquads.append((c, s, p, o))
     return newquads
 
@@ -22,8 +27,67 @@ def transform(uri, hashstr, baseuri, bnodemap):
         return None
 
     if baseuri is None:
+        # Plain str, URIRef would warn about the blank replacing the hash in every normalized URI
         try:
-            return URIRef(RdfUtils.normalize(uri, hashstr).decode('utf-8'))
+            return RdfUtils.normalize(uri, hashstr).decode('utf-8')
         except Exception:
-            return URIRef(RdfUtils.normalize(uri, hashstr))
+            return RdfUtils.normalize(uri, hashstr)
     return RdfUtils.get_trustyuri(uri, baseuri, hashstr, bnodemap)
+
+
+class PreprocessContext:
+    """Same results as transform(), with the values derived from the hashstr and baseuri computed once,
+    and the transformation of each distinct term memoized"""
+
+    def __init__(self, hashstr=None, baseuri=None, bnodemap=None):
+        self.hashstr = hashstr
+        self.baseuri = baseuri
+        self.bnodemap = {} if bnodemap is None else bnodemap
+        self._transformed: dict = {}
+        if baseuri is None:
+            if isinstance(hashstr, bytes):
+                hashstr = hashstr.decode('utf-8')
+            self._hash_pattern = re.compile(hashstr) if hashstr is not None else None
+        else:
+            self._base = str(baseuri)
+            # baseuri passed is the np namespace, np_uri is the nanopub URI without trailing # or /
+            self._np_uri = self._base[:-1] if self._base.endswith('#') or self._base.endswith('/') else self._base
+            prefix = "/".join(baseuri.split('/')[:-1]) + '/'
+            if self._base.startswith(NP_TEMP_PREFIX):
+                prefix = NP_PREFIX
+            self._hash_uri = f"{prefix}{hashstr}"
+
+    def transform(self, uri):
+        if uri is None:
+            return None
+        # rdflib terms of different types are never equal, so a str, URIRef or BNode get their own entry
+        transformed = self._transformed.get(uri)
+        if transformed is None and uri not in self._transformed:
+            if self.baseuri is None:
+                transformed = self._normalize(uri)
+            else:
+                transformed = self._get_trustyuri(uri)
+            self._transformed[uri] = transformed
+        return transformed
+
+    def _normalize(self, uri):
+        if self._hash_pattern is None:
+            return str(uri)
+        return self._hash_pattern.sub(" ", str(uri))
+
+    def _get_trustyuri(self, resource):
+        if isinstance(resource, URIRef):
+            uri = str(resource)
+            if uri == self._np_uri or uri == self._base:
+                return self._hash_uri
+            if uri.startswith(self._base):
+                return f"{self._hash_uri}/{uri[len(self._base):]}"
+            return uri
+        if isinstance(resource, BNode):
+            # Check if BNode in the form of N2b80343001e94f48bdee0901be566ebb
+            # Which means it was automatically generated by rdflib: we use a number in this case
+            if _unnamed_bnode_pattern.match(str(resource)):
+                return f"{self._hash_uri}#_{RdfUtils.get_bnode_number(resource, self.bnodemap)}"
+            # If the user gave a specific name to the bnode with rdflib
+            return f"{self._hash_uri}#_{resource}"
+        return None
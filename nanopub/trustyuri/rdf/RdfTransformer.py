@@ -1,36 +1,107 @@
+import hashlib
+import io
 import os
 import re
+from itertools import islice
 
-from nanopub.trustyuri.rdf import HashAdder, RdfHasher, RdfPreprocessor, RdfUtils
+from nanopub.trustyuri import TrustyUriUtils
+from nanopub.trustyuri.rdf import (
+    EncodedHasher,
+    HashAdder,
+    QuadParser,
+    QuadWriter,
+    RdfHasher,
+    RdfPreprocessor,
+    RdfUtils,
+)
+from nanopub.trustyuri.rdf.ExternalSort import ExternalSorter
+from nanopub.trustyuri.rdf.StatementComparator import StatementComparator
 
 
 def transform_to_file(conjgraph, baseuri, outdir, filename):
+    hashstr, quads = _transform_quads(conjgraph, baseuri)
+    rdfFormat = RdfUtils.get_format(filename)
+    outfile = get_output_filename(baseuri, outdir, filename, hashstr)
+    if rdfFormat in QuadWriter.FORMATS:
+        # The quads are sorted: no need for a graph to write them
+        QuadWriter.write_to_file(quads, outfile, rdfFormat)
+    else:
+        RdfUtils.get_conjunctivegraph(quads).serialize(outfile, format=rdfFormat)
+    return RdfUtils.get_trustyuri(baseuri, baseuri, hashstr, None)
+
+
+def transform_to_string(conjgraph, baseuri):
+    _hashstr, quads = _transform_quads(conjgraph, baseuri)
+    out = io.StringIO()
+    QuadWriter.write_trix(quads, out)
+    return out.getvalue()
+
+
+def transform(conjgraph, baseuri):
+    _hashstr, quads = _transform_quads(conjgraph, baseuri)
+    return RdfUtils.get_conjunctivegraph(quads)
+
+
+def _transform_quads(conjgraph, baseuri):
+    """Compute the hash of the graph, and return it with the quads with the hash added, in normalized order"""
     quads = RdfUtils.get_quads(conjgraph)
-    quads = RdfPreprocessor.preprocess(quads, baseuri=baseuri)
-    hashstr = RdfHasher.make_hash(quads)
-    quads = HashAdder.addhash(quads, hashstr)
-    conjgraph = RdfUtils.get_conjunctivegraph(quads)
+    quads = RdfPreprocessor.preprocess(quads, hashstr=" ", baseuri=baseuri)
+    hashstr, quads = EncodedHasher.make_hash_and_sort(quads)
+    return hashstr, HashAdder.addhash(quads, hashstr)
+
+
+def get_output_filename(baseuri, outdir, filename, hashstr):
     name = ""
     if (baseuri is not None) and re.match('.*/.*', str(baseuri)):
         name = re.sub(r'^.*[^A-Za-z0-9.\-_]([A-Za-z0-9.\-_]*)$', r'\1', str(baseuri)) + "."
     ext = os.path.splitext(filename)[1]
-    rdfFormat = RdfUtils.get_format(filename)
-    conjgraph.serialize(outdir + "/" + name + hashstr + ext, format=rdfFormat)
+    return outdir + "/" + name + hashstr + ext
+
+
+def transform_large_file(filename, baseuri, outdir, run_size=100000, tmpdir=None):
+    """Same as transform_to_file() for a N-Quads file that does not fit in memory.
+
+    The quads are read by chunks of run_size, and the normalized quads are sorted with an external merge sort
+    in tmpdir to compute the hash. The file is then read a second time to write the quads with the hash added.
+    Blank nodes are not supported, as their numbering depends on the order of all the quads.
+    """
+    hashstr = make_large_file_hash(filename, baseuri, run_size, tmpdir)
+    with open(get_output_filename(baseuri, outdir, filename, hashstr), "w", encoding="utf-8") as out:
+        for quads in _read_nquads_chunks(filename, run_size):
+            quads = RdfPreprocessor.preprocess(quads, hashstr=" ", baseuri=baseuri)
+            for q in HashAdder.addhash(quads, hashstr):
+                out.write(RdfUtils.to_nquads_line(q))
     return RdfUtils.get_trustyuri(baseuri, baseuri, hashstr, None)
 
 
-def transform_to_string(conjgraph, baseuri):
-    quads = RdfUtils.get_quads(conjgraph)
-    quads = RdfPreprocessor.preprocess(quads, baseuri=baseuri)
-    hashstr = RdfHasher.make_hash(quads)
-    quads = HashAdder.addhash(quads, hashstr)
-    conjgraph = RdfUtils.get_conjunctivegraph(quads)
-    return conjgraph.serialize(format='trix')
+def make_large_file_hash(filename, baseuri, run_size=100000, tmpdir=None):
+    """Compute the hash transform_large_file() adds to a N-Quads file, without loading it in memory"""
+    comp = StatementComparator()
+    h = hashlib.sha256()
+    with ExternalSorter(run_size=run_size, tmpdir=tmpdir) as sorter:
+        for quads in _read_nquads_chunks(filename, run_size):
+            for q in RdfPreprocessor.preprocess(quads, hashstr=" ", baseuri=baseuri):
+                statement = "".join(RdfHasher.value_to_string(v) for v in q)
+                sorter.add(comp.sort_key_bytes(q), statement.encode('utf-8'))
+        previous = None
+        for _key, statement in sorter.sorted():
+            if statement != previous:
+                h.update(statement)
+            previous = statement
+    return "RA" + TrustyUriUtils.get_base64(h.digest())
 
 
-def transform(conjgraph, baseuri):
-    quads = RdfUtils.get_quads(conjgraph)
-    quads = RdfPreprocessor.preprocess(quads, baseuri=baseuri)
-    hashstr = RdfHasher.make_hash(quads)
-    quads = HashAdder.addhash(quads, hashstr)
-    return RdfUtils.get_conjunctivegraph(quads)
+def _read_nquads_chunks(filename, chunk_size):
+    if RdfUtils.get_format(filename) != "nquads":
+        raise ValueError(f"Only N-Quads files can be transformed without loading them in memory: {filename}")
+    with open(filename, encoding="utf-8") as f:
+        while True:
+            lines = list(islice(f, chunk_size))
+            if not lines:
+                return
+            try:
+                yield QuadParser.parse_quads("".join(lines), "nquads")
+            except QuadParser.UnsupportedSyntaxError as e:
+                raise QuadParser.UnsupportedSyntaxError(
+                    f"Cannot transform {filename} without loading it in memory: {e}"
+                ) from e
@@ -1,10 +1,11 @@
 import re
 
 from rdflib.graph import ConjunctiveGraph, Graph
-from rdflib.term import BNode, URIRef
+from rdflib.term import BNode, Literal, URIRef
 from rdflib.util import guess_format
 
 from nanopub.definitions import NP_PREFIX, NP_TEMP_PREFIX
+from nanopub.trustyuri.rdf import QuadParser
 
 
 def get_trustyuri(resource, baseuri, hashstr, bnodemap):
@@ -89,17 +90,57 @@ def get_quads(conjunctivegraph):
     return quads
 
 
+def read_quads(content, rdf_format):
+    """Get the quads of N-Quads or TriG content without building a graph,
+    fall back to parsing it with rdflib for other formats or unsupported syntax"""
+    try:
+        return QuadParser.parse_quads(content, rdf_format)
+    except QuadParser.UnsupportedSyntaxError:
+        cg = ConjunctiveGraph()
+        cg.parse(data=content, format=rdf_format)
+        return get_quads(cg)
+
+
 def get_conjunctivegraph(quads):
+    """Load quads in a new ConjunctiveGraph, quads without context go to the default graph"""
     cg = ConjunctiveGraph()
-#     for (c, s, p, o) in quads:
-#         cg.default_context = Graph(store=cg.store, identifier=c)
-#         cg.add((s, p, o))
-    cg.addN([(s, p, o, Graph(store=cg.store, identifier=c)) for (c, s, p, o) in quads])
+    # One Graph per distinct context, instead of one per quad
+    graphs: dict = {None: cg.default_context}
+
+    def get_graph(c):
+        g = graphs.get(c)
+        if g is None:
+            g = Graph(store=cg.store, identifier=c)
+            graphs[c] = g
+        return g
+
+    # ConjunctiveGraph.addN() would still create a Graph per quad to check the context: feed the store directly
+    cg.store.addN((s, p, o, get_graph(c)) for (c, s, p, o) in quads)
     return cg
 
 
+def to_nquads_line(quad):
+    """Serialize a (context, subject, predicate, object) quad of URIRef and Literal to a N-Quads line"""
+    c, s, p, o = quad
+    if c is None:
+        return f"<{s}> <{p}> {to_nquads_term(o)} .\n"
+    return f"<{s}> <{p}> {to_nquads_term(o)} <{c}> .\n"
+
+
+def to_nquads_term(term):
+    """Serialize a URIRef or Literal as in N-Quads, the same syntax is valid in TriG"""
+    if not isinstance(term, Literal):
+        return f"<{term}>"
+    value = term.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n').replace('\r', '\\r')
+    if term.language is not None:
+        return f'"{value}"@{term.language}'
+    if term.datatype is not None:
+        return f'"{value}"^^<{term.datatype}>'
+    return f'"{value}"'
+
+
 def get_format(filename):
-    return guess_format(filename, {'xml': 'trix', 'ttl': 'turtle', 'nq': 'nquads', 'nt': 'nt', 'rdf': 'xml'})
+    return guess_format(filename, {'xml': 'trix', 'ttl': 'turtle', 'nq': 'nquads', 'nt': 'nt', 'rdf': 'xml', 'trig': 'trig'})
 
 
 def get_str(s):
@@ -9,9 +9,16 @@ from nanopub.trustyuri.rdf import RdfTransformer, RdfUtils
 
 
 def transform(args):
+    """Arguments: filename baseuri [--external-sort]
+    With --external-sort, N-Quads files are transformed without loading them in memory"""
     filename = args[0]
     baseuristr = args[1]
 
+    if "--external-sort" in args[2:]:
+        outdir = os.path.abspath(os.path.join(str(filename), os.pardir))
+        RdfTransformer.transform_large_file(filename, URIRef(baseuristr), outdir)
+        return
+
     with open(filename) as f:
         rdfFormat = RdfUtils.get_format(filename)
         cg = ConjunctiveGraph()
@@ -1,11 +1,12 @@
 import logging
 import re
-from dataclasses import asdict, dataclass
-from typing import Any, Optional
+from dataclasses import asdict, dataclass, field
+from typing import Any, List, NamedTuple, Optional
 
-from rdflib import ConjunctiveGraph, Namespace, URIRef
+from rdflib import RDF, ConjunctiveGraph, Namespace, URIRef
 
 from nanopub.definitions import DUMMY_NAMESPACE, DUMMY_URI
+from nanopub.namespaces import NP, NPX
 
 log = logging.getLogger()
 
@@ -36,44 +37,69 @@ class NanopubMetadata:
     dict = asdict
 
 
+@dataclass
+class NanopubVerification:
+    """Result of the verification of the signature and trusty URI of a nanopub."""
+
+    np_uri: Optional[URIRef] = None
+    trusty: Optional[str] = None
+    expected_trusty: Optional[str] = None
+
+    valid_trusty: bool = False
+    valid_signature: bool = False
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def is_valid(self) -> bool:
+        return self.valid_trusty and self.valid_signature
+
+    dict = asdict
+
+
+@dataclass
+class NanopubViolation:
+    """A structural rule that a nanopub does not follow, identified by a short rule name."""
+
+    rule: str
+    message: str
+
+    dict = asdict
+
+
+class _NanopubRow(NamedTuple):
+    """A nanopub found in a Graph, with the same fields as the SPARQL query results"""
+
+    np: Any
+    head: Any
+    assertion: Any
+    provenance: Any
+    pubinfo: Any
+    sigUri: Any = None
+    signature: Any = None
+    pubkey: Any = None
+    algo: Any = None
+
+
 def extract_np_metadata(g: ConjunctiveGraph) -> NanopubMetadata:
     """Extract a nanopub URI, namespace and head/assertion/prov/pubinfo contexts from a Graph"""
-    get_np_query = """prefix np: <http://www.nanopub.org/nschema#>
-
-SELECT DISTINCT ?np ?head ?assertion ?provenance ?pubinfo ?sigUri ?signature ?pubkey ?algo
-WHERE {
-    GRAPH ?head {
-        ?np a np:Nanopublication ;
-            np:hasAssertion ?assertion ;
-            np:hasProvenance ?provenance ;
-            np:hasPublicationInfo ?pubinfo .
-    }
-    GRAPH ?pubinfo {
-        OPTIONAL {
-            ?sigUri npx:hasSignatureTarget ?np ;
-                npx:hasPublicKey ?pubkey ;
-                npx:hasAlgorithm ?algo ;
-                npx:hasSignature ?signature .
-        }
-    }
-}
-"""
-    qres: Any = g.query(get_np_query)
-    if len(qres) < 1:
+    rows = _find_np_rows(g)
+    if rows is None:
+        rows = _query_np_rows(g)
+    if len(rows) < 1:
         raise MalformedNanopubError(
             "\033[1mNo nanopublication\033[0m has been found in the provided RDF. "
             "It should contain a np:Nanopublication object in a Head graph, pointing to 3 graphs: assertion, provenance and pubinfo"
         )
-    if len(qres) > 1:
+    if len(rows) > 1:
         np_found: list = []
-        for row in qres:
+        for row in rows:
             np_found.append(row.np)
         raise MalformedNanopubError(
             f"\033[1mMultiple nanopublications\033[0m are defined in this graph: {', '.join(np_found)}. "
             "The Nanopub object can only handles 1 nanopublication at a time"
         )
     np_meta = NanopubMetadata()
-    for row in qres:
+    for row in rows:
         np_meta.head = row.head
         np_meta.assertion = row.assertion
         np_meta.provenance = row.provenance
@@ -100,3 +126,68 @@ WHERE {
             np_meta.namespace = Namespace(np_meta.np_uri + '#')
 
     return np_meta
+
+
+def _find_np_rows(g: ConjunctiveGraph) -> Optional[List[_NanopubRow]]:
+    """Find the nanopubs in a Graph with a few triple pattern lookups.
+
+    Returns None if the Graph has to be checked with the SPARQL query instead
+    (head outside of a named graph, empty pubinfo, several values for a property)."""
+    rows = []
+    for np_uri, _, _, head_g in g.quads((None, RDF.type, NP.Nanopublication)):
+        if not isinstance(head_g.identifier, URIRef):
+            return None
+        graphs = []
+        for p in (NP.hasAssertion, NP.hasProvenance, NP.hasPublicationInfo):
+            values = list(head_g.objects(np_uri, p))
+            if len(values) > 1:
+                return None
+            graphs.append(values[0] if values else None)
+        if None in graphs:
+            continue
+        pubinfo_g = g.get_context(graphs[2])
+        if len(pubinfo_g) < 1:
+            return None
+        sigs = []
+        for sig_uri in pubinfo_g.subjects(NPX.hasSignatureTarget, np_uri):
+            sig_values = []
+            for p in (NPX.hasSignature, NPX.hasPublicKey, NPX.hasAlgorithm):
+                values = list(pubinfo_g.objects(sig_uri, p))
+                if len(values) > 1:
+                    return None
+                sig_values.append(values[0] if values else None)
+            if None not in sig_values:
+                sigs.append((sig_uri, *sig_values))
+        if len(sigs) > 1:
+            return None
+        rows.append(_NanopubRow(np_uri, head_g.identifier, *graphs, *(sigs[0] if sigs else ())))
+    if len(set(rows)) != len(rows):
+        return None
+    return rows
+
+
+def _query_np_rows(g: ConjunctiveGraph) -> List[_NanopubRow]:
+    """Find the nanopubs in a Graph with a SPARQL query"""
+    get_np_query = """prefix np: <http://www.nanopub.org/nschema#>
+prefix npx: <http://purl.org/nanopub/x/>
+
+SELECT DISTINCT ?np ?head ?assertion ?provenance ?pubinfo ?sigUri ?signature ?pubkey ?algo
+WHERE {
+    GRAPH ?head {
+        ?np a np:Nanopublication ;
+            np:hasAssertion ?assertion ;
+            np:hasProvenance ?provenance ;
+            np:hasPublicationInfo ?pubinfo .
+    }
+    GRAPH ?pubinfo {
+        OPTIONAL {
+            ?sigUri npx:hasSignatureTarget ?np ;
+                npx:hasPublicKey ?pubkey ;
+                npx:hasAlgorithm ?algo ;
+                npx:hasSignature ?signature .
+        }
+    }
+}
+"""
+    qres: Any = g.query(get_np_query)
+    return [_NanopubRow(*row) for row in qres]
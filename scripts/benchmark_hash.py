@@ -0,0 +1,55 @@
+"""Benchmark of the hash of large sets of quads, used for in-memory trusty transforms.
+
+Compares RdfHasher.make_hash() to EncodedHasher.make_hash() (numpy is used when installed),
+and checks they give the same hash. The reference is skipped above --reference-max quads.
+
+    python scripts/benchmark_hash.py --sizes 10000 100000 1000000 10000000
+"""
+import argparse
+import time
+
+from rdflib import Literal, URIRef
+
+from nanopub.trustyuri.rdf import EncodedHasher, RdfHasher
+
+BASE_URI = "http://example.org/dataset/"
+
+
+def build_quads(n_quads: int) -> list:
+    graphs = [URIRef(f"{BASE_URI}graph{i}") for i in range(4)]
+    predicates = [URIRef(f"http://example.org/vocab#p{i}") for i in range(20)]
+    quads = []
+    for i in range(n_quads):
+        o = Literal(f"value {i % 1000}", lang="en") if i % 3 else URIRef(f"{BASE_URI}o{i % 5000}")
+        quads.append((graphs[i % len(graphs)], URIRef(f"{BASE_URI}s{i // 7}"), predicates[i % len(predicates)], o))
+    return quads
+
+
+def timed(make_hash, quads):
+    start = time.perf_counter()
+    # make_hash() sorts the quads it is given in place
+    result = make_hash(list(quads), hashstr=" ", baseuri=BASE_URI)
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000], help="Numbers of quads")
+    parser.add_argument("--reference-max", type=int, default=1000000,
+                        help="Largest number of quads also hashed with RdfHasher")
+    args = parser.parse_args()
+
+    print(f"numpy: {'yes' if EncodedHasher.numpy is not None else 'no'}")
+    for size in args.sizes:
+        quads = build_quads(size)
+        encoded_hash, encoded = timed(EncodedHasher.make_hash, quads)
+        line = f"{size:>10} quads   encoded: {encoded:8.2f} s"
+        if size <= args.reference_max:
+            reference_hash, reference = timed(RdfHasher.make_hash, quads)
+            assert encoded_hash == reference_hash, f"Different hash for {size} quads"
+            line += f"   reference: {reference:8.2f} s   x{reference / encoded:.1f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Micro-benchmark of the quads preprocessing done before hashing and signing nanopubs.
+
+Compares RdfPreprocessor.preprocess() to calling transform() on every term, and checks they give the same quads.
+
+    python scripts/benchmark_preprocess.py --triples 5000
+"""
+import argparse
+import timeit
+
+from rdflib import BNode, Literal, URIRef
+
+from nanopub.trustyuri.rdf.RdfPreprocessor import preprocess, transform
+
+DUMMY_NS = "http://purl.org/nanopub/temp/np/"
+TRUSTY = "RAoXkQkJe_lpMhYW61Y9mqWDHa5MAj1o4pWIiYLmAzY50"
+
+
+def build_quads(n_triples: int) -> list:
+    graphs = [URIRef(DUMMY_NS + g) for g in ["Head", "assertion", "provenance", "pubinfo"]]
+    predicates = [URIRef(f"http://example.org/vocab#p{i}") for i in range(10)]
+    bnodes = [BNode() for _ in range(n_triples // 10 + 1)]
+    quads = []
+    for i in range(n_triples):
+        s = bnodes[i % len(bnodes)] if i % 3 == 0 else URIRef(f"{DUMMY_NS}s{i % 100}")
+        o = Literal(f"value {i}") if i % 2 else URIRef(f"http://example.org/o{i % 50}")
+        quads.append((graphs[i % len(graphs)], s, predicates[i % len(predicates)], o))
+    return quads
+
+
+def preprocess_per_term(quads, hashstr=None, baseuri=None):
+    """Preprocessing as done before PreprocessContext: every term of every quad is transformed"""
+    newquads = []
+    bnodemap: dict = {}
+    for q in quads:
+        o = q[3]
+        if isinstance(o, URIRef) or isinstance(o, BNode):
+            o = transform(o, hashstr, baseuri, bnodemap)
+        newquads.append((
+            transform(q[0], hashstr, baseuri, bnodemap),
+            transform(q[1], hashstr, baseuri, bnodemap),
+            transform(q[2], hashstr, baseuri, bnodemap),
+            o,
+        ))
+    return newquads
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--triples", type=int, default=2000, help="Number of quads to preprocess")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timed runs, the best one is reported")
+    args = parser.parse_args()
+
+    quads = build_quads(args.triples)
+    cases = {
+        "sign (baseuri)": {"hashstr": " ", "baseuri": DUMMY_NS},
+        "verify (hashstr)": {"hashstr": TRUSTY},
+    }
+    for name, kwargs in cases.items():
+        assert preprocess(quads, **kwargs) == preprocess_per_term(quads, **kwargs), f"Different output for {name}"
+        per_term = min(timeit.repeat(lambda: preprocess_per_term(quads, **kwargs), number=1, repeat=args.repeat))
+        context = min(timeit.repeat(lambda: preprocess(quads, **kwargs), number=1, repeat=args.repeat))
+        print(f"{name:<18} per term: {per_term * 1000:8.2f} ms   context: {context * 1000:8.2f} ms   "
+              f"x{per_term / context:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,15 @@
+import json
 import os
 import tempfile
 
 import pytest
 import requests
+from requests.adapters import HTTPAdapter
 
 from nanopub import NanopubConf, load_profile
 from nanopub.client import TEST_NANOPUB_QUERY_URL
 from nanopub.definitions import TEST_RESOURCES_FILEPATH
+from nanopub.transport import HttpTransport
 from tests.java_wrapper import JavaWrapper
 
 
@@ -28,6 +31,67 @@ skip_if_nanopub_server_unavailable = (
 )
 
 
+class RecordingAdapter(HTTPAdapter):
+    """Adapter answering the requests without network, and recording the requests sent.
+    respond(request) returns the body and headers of the response, and optionally its status code,
+    an empty JSON search result by default"""
+
+    def __init__(self, respond=None):
+        super().__init__()
+        self.respond = respond or (lambda request: (b'{"results": {"bindings": []}}', {}))
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append((request, kwargs))
+        body, headers, *status = self.respond(request)
+        response = requests.Response()
+        response.status_code = status[0] if status else 200
+        response._content = body
+        response.headers.update(headers)
+        response.url = request.url
+        response.request = request
+        return response
+
+
+class Clock:
+    """Clock of the caches and health trackers, only moved forward by the tests"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def recording_transport(respond=None, **kwargs):
+    """HttpTransport answering all the https requests with a RecordingAdapter"""
+    adapter = RecordingAdapter(respond)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    return HttpTransport(session=session, **kwargs), adapter
+
+
+def search_page(*nps):
+    bindings = [{"np": {"value": np}, "date": {"value": "2024-01-01"}} for np in nps]
+    return json.dumps({"results": {"bindings": bindings}}).encode()
+
+
+def respond_pages(request):
+    """Three pages of results, linked by Link headers with a relative and an absolute URL"""
+    if "page=3" in request.url:
+        return search_page("np5"), {}
+    if "page=2" in request.url:
+        next_url = request.url.replace("page=2", "page=3")
+        return search_page("np3", "np4"), {"Link": f'<{next_url}>; rel="next"'}
+    path = request.path_url.split("?")[0]
+    return search_page("np1", "np2"), {"Link": f'<{path}?page=2>; rel="next", <{path}?page=3>; rel="last"'}
+
+
 # Create a temporary profile.yml file for testing
 profile_test_path = os.path.join(tempfile.mkdtemp(), "profile.yml")
 profile_yaml = f"""orcid_id: https://orcid.org/0000-0000-0000-0000
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from nanopub import AsyncNanopubClient
+from nanopub.definitions import TEST_RESOURCES_FILEPATH
+from tests.conftest import recording_transport, respond_pages, search_page
+
+
+def test_async_search_streams_pages():
+    transport, adapter = recording_transport(respond_pages)
+
+    async def search():
+        async with AsyncNanopubClient(transport=transport) as client:
+            results = [r["np"] async for r in client.find_nanopubs_with_pattern(subj="https://example.org/s")]
+            assert results == ["np1", "np2", "np3", "np4", "np5"]
+            assert len(adapter.sent) == 3
+
+            adapter.sent.clear()
+            results = client.find_things(type="https://example.org/Type")
+            assert (await results.__anext__())["np"] == "np1"
+            await results.aclose()
+            # Only the next page was prefetched, and its request is cancelled or completed
+            assert len(adapter.sent) <= 2
+
+            assert [r async for r in client.find_nanopubs_with_text("")] == []
+            with pytest.raises(ValueError):
+                client.find_things(type="https://example.org/Type", searchterm="")
+
+    asyncio.run(search())
+
+
+def test_async_concurrency_is_bounded():
+    lock = threading.Lock()
+    running = []
+    max_running = []
+
+    def respond(request):
+        with lock:
+            running.append(request)
+            max_running.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.remove(request)
+        return search_page(request.url), {}
+
+    transport, adapter = recording_transport(respond)
+
+    async def search(client, text):
+        return [r["np"] async for r in client.find_nanopubs_with_text(text)]
+
+    async def search_all():
+        async with AsyncNanopubClient(transport=transport, max_concurrency=3) as client:
+            return await asyncio.gather(*[search(client, f"text{i}") for i in range(12)])
+
+    results = asyncio.run(search_all())
+    assert [len(r) for r in results] == [1] * 12
+    assert all(f"text{i}" in r[0] for i, r in enumerate(results))
+    assert len(adapter.sent) == 12
+    assert 1 < max(max_running) <= 3
+
+
+def test_async_fetch():
+    with open(TEST_RESOURCES_FILEPATH / "nanopub_sample_signed.trig", "rb") as f:
+        trig = f.read()
+
+    def respond(request):
+        if "missing" in request.url:
+            return b"", {}
+        return trig, {}
+
+    transport, adapter = recording_transport(respond)
+
+    async def fetch():
+        async with AsyncNanopubClient(transport=transport) as client:
+            uris = [f"https://example.org/np/RA{i}" for i in range(5)]
+            nanopubs = await client.fetch_all(uris)
+            assert [np.source_uri for np in nanopubs] == uris
+            assert all(len(np.assertion) > 0 for np in nanopubs)
+            assert sorted(request.url for request, _kwargs in adapter.sent) == [uri + ".trig" for uri in uris]
+
+            nanopubs = await client.fetch_all(uris[:1] + ["https://example.org/np/missing"], return_exceptions=True)
+            assert nanopubs[0].source_uri == uris[0]
+            assert isinstance(nanopubs[1], Exception)
+
+    asyncio.run(fetch())
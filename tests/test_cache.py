@@ -0,0 +1,140 @@
+import asyncio
+import threading
+
+import pytest
+
+from nanopub import AsyncNanopubClient, DiskQueryCache, MemoryQueryCache, NanopubClient
+from nanopub.cache import QueryCache, cache_key
+from tests.conftest import recording_transport, respond_pages
+
+
+def test_query_cache_is_abstract():
+    class IncompleteCache(QueryCache):
+        def clear(self):
+            pass
+
+    with pytest.raises(TypeError):
+        IncompleteCache()
+
+
+def test_cache_key():
+    assert cache_key("find", {"b": "2", "a": 1, "c": None}) == cache_key("find", {"a": "1", "b": "2"})
+    assert cache_key("find", {"a": "1"}) != cache_key("find_valid", {"a": "1"})
+
+
+@pytest.mark.parametrize("backend", ["memory", "disk"])
+def test_query_cache(backend, tmp_path, clock):
+    if backend == "memory":
+        cache = MemoryQueryCache(maxsize=2, ttl=10, stale_ttl=20, clock=clock)
+    else:
+        cache = DiskQueryCache(tmp_path / "cache", maxsize=2, ttl=10, stale_ttl=20, clock=clock)
+    results = [{"np": "np1", "date": "2024-01-01", "description": ""}]
+    cache.store("a", results)
+    assert cache.lookup("a") == (results, False)
+    clock.now += 10
+    assert cache.lookup("a") == (results, True)
+    clock.now += 20
+    assert cache.lookup("a") == (None, False)
+
+    # The least recently used search is removed first
+    for key in ["a", "b", "c"]:
+        cache.store(key, results)
+        clock.now += 1
+        if key == "b":
+            assert cache.lookup("a")[0] == results
+            clock.now += 1
+    assert cache.lookup("b") == (None, False)
+    assert cache.lookup("a")[0] == results
+    assert cache.lookup("c")[0] == results
+
+    if backend == "disk":
+        assert DiskQueryCache(tmp_path / "cache", clock=clock).lookup("c")[0] == results
+    cache.clear()
+    assert cache.lookup("c") == (None, False)
+
+
+def test_client_cache(clock):
+    cache = MemoryQueryCache(ttl=10, stale_ttl=20, clock=clock)
+    nps = ["np1", "np2", "np3", "np4", "np5"]
+
+    # Results are only cached when all the pages are read
+    results = NanopubClient(transport=recording_transport(respond_pages)[0], cache=cache).find_nanopubs_with_pattern(
+        subj="https://example.org/s"
+    )
+    next(results)
+    results.close()
+    assert cache.lookup(cache_key(*NanopubClient._pattern_query(subj="https://example.org/s")))[0] is None
+
+    transport, adapter = recording_transport(respond_pages)
+    client = NanopubClient(transport=transport, cache=cache)
+    assert [r["np"] for r in client.find_nanopubs_with_pattern(subj="https://example.org/s")] == nps
+    assert len(adapter.sent) == 3
+    results = list(client.find_nanopubs_with_pattern(subj="https://example.org/s"))
+    assert [r["np"] for r in results] == nps
+    assert len(adapter.sent) == 3
+    # The cached results are not changed by the callers
+    results[0]["np"] = "changed"
+    assert next(client.find_nanopubs_with_pattern(subj="https://example.org/s"))["np"] == "np1"
+
+    # Stale results are returned while the search is done again in the background
+    clock.now += 15
+    assert [r["np"] for r in client.find_nanopubs_with_pattern(subj="https://example.org/s")] == nps
+    client._revalidation_executor.submit(lambda: None).result()
+    assert len(adapter.sent) == 6
+    assert cache.lookup(cache_key(*client._pattern_query(subj="https://example.org/s")))[1] is False
+
+    async def search():
+        async with AsyncNanopubClient(transport=transport, cache=cache) as async_client:
+            assert [r["np"] async for r in async_client.find_nanopubs_with_pattern(subj="https://example.org/s")] == nps
+            assert len(adapter.sent) == 6
+            assert [r["np"] async for r in async_client.find_things(type="https://example.org/Type")] == nps
+            assert [r["np"] async for r in async_client.find_things(type="https://example.org/Type")] == nps
+            assert len(adapter.sent) == 9
+
+    asyncio.run(search())
+
+
+def test_async_client_uses_cache_in_executor(tmp_path):
+    threads = []
+
+    class RecordingCache(DiskQueryCache):
+        def _get(self, key):
+            threads.append(threading.get_ident())
+            return super()._get(key)
+
+        def _set(self, key, entry):
+            threads.append(threading.get_ident())
+            super()._set(key, entry)
+
+    transport, adapter = recording_transport(respond_pages)
+
+    async def search():
+        async with AsyncNanopubClient(transport=transport, cache=RecordingCache(tmp_path)) as async_client:
+            for _ in range(2):
+                assert len([r async for r in async_client.find_things(type="https://example.org/Type")]) == 5
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(search())
+    # Lookup and store of the first search, lookup of the second one
+    assert len(threads) == 3 and loop_thread not in threads
+    assert len(adapter.sent) == 3
+
+
+def test_client_close(clock):
+    cache = MemoryQueryCache(ttl=10, stale_ttl=20, clock=clock)
+    transport, adapter = recording_transport(respond_pages)
+    with NanopubClient(transport=transport, cache=cache) as client:
+        assert len(list(client.find_things(type="https://example.org/Type"))) == 5
+    # Stale results are still returned by a closed client, without refreshing them
+    clock.now += 15
+    assert len(list(client.find_things(type="https://example.org/Type"))) == 5
+    assert len(adapter.sent) == 3
+
+    async def close():
+        async with AsyncNanopubClient(transport=transport, cache=cache) as async_client:
+            pass
+        return async_client
+
+    async_client = asyncio.run(close())
+    with pytest.raises(RuntimeError):
+        async_client.client._revalidation_executor.submit(lambda: None)
@@ -3,7 +3,7 @@ from rdflib import RDF, URIRef
 
 from nanopub import NanopubClient
 from nanopub.definitions import TEST_RESOURCES_FILEPATH
-from tests.conftest import skip_if_nanopub_server_unavailable
+from tests.conftest import recording_transport, respond_pages, skip_if_nanopub_server_unavailable
 
 client = NanopubClient(use_test_server=True)
 prod_client = NanopubClient(use_test_server=False)
@@ -205,3 +205,21 @@ class TestNanopubClient:
     )
     def test_parse_search_result(self, test_input, expected):
         assert client._parse_search_result(test_input) == expected
+
+
+def test_search_streams_pages():
+    transport, adapter = recording_transport(respond_pages)
+    search_client = NanopubClient(transport=transport)
+    results = search_client.find_nanopubs_with_pattern(subj="https://example.org/s")
+    assert [r["np"] for r in results] == ["np1", "np2", "np3", "np4", "np5"]
+    # One request per page: the response of the server found first is not requested again
+    urls = [request.url for request, _kwargs in adapter.sent]
+    assert len(urls) == 3
+    assert urls[1].startswith(urls[0].split("?")[0]) and urls[1].endswith("?page=2")
+
+    adapter.sent.clear()
+    results = search_client.find_nanopubs_with_pattern(subj="https://example.org/s")
+    assert next(results)["np"] == "np1"
+    results.close()
+    # Only the next page was prefetched
+    assert len(adapter.sent) <= 2
@@ -1,7 +1,9 @@
 import pytest
 from rdflib import BNode, Graph, Literal, URIRef
 
+import nanopub.nanopub
 from nanopub import Nanopub, NanopubClaim, NanopubConf, NanopubRetract, NanopubUpdate, create_nanopub_index, namespaces
+from nanopub.sign_utils import verify_nanopub
 from nanopub.templates.nanopub_introduction import NanopubIntroduction
 from tests.conftest import default_conf, profile_test, skip_if_nanopub_server_unavailable
 
@@ -67,6 +69,61 @@ def test_nanopub_sign_bnode2():
     assert expected_trusty in np.source_uri
     assert np.has_valid_signature
 
+
+@pytest.mark.parametrize("reverse", [False, True])
+def test_nanopub_replace_blank_nodes(reverse):
+    np = Nanopub(conf=default_conf)
+    unnamed = BNode()
+    triples = [
+        (unnamed, namespaces.HYCL.claims, BNode('named')),
+        (URIRef('http://test'), namespaces.HYCL.claims, unnamed),
+    ]
+    for triple in reversed(triples) if reverse else triples:
+        np.assertion.add(triple)
+    np._replace_blank_nodes(np.rdf)
+    ns = np.metadata.namespace
+    # The unnamed blank node gets the same number as subject and as object, whatever the order of the quads
+    assert set(np.assertion) == {
+        (ns["_1"], namespaces.HYCL.claims, ns["_named"]),
+        (URIRef('http://test'), namespaces.HYCL.claims, ns["_1"]),
+    }
+    # Nothing left to replace: the graph is not touched
+    version = np._rdf_version()
+    np._replace_blank_nodes(np.rdf)
+    assert np._rdf_version() == version
+
+
+def test_nanopub_cache_invalidated_on_change(monkeypatch):
+    assertion = Graph()
+    assertion.add((
+        URIRef('http://test'), namespaces.HYCL.claims, Literal('This is a test of nanopub-python')
+    ))
+    np = Nanopub(
+        conf=default_conf,
+        assertion=assertion
+    )
+    np.sign()
+    calls = []
+    monkeypatch.setattr(nanopub.nanopub, "verify_nanopub", lambda g: calls.append(g) or verify_nanopub(g))
+    result = np.verify()
+    assert result.is_valid
+    # The verification is cached, but the callers get a copy of it
+    result.errors.append("changed by the caller")
+    result.valid_signature = False
+    assert np.verify().is_valid and np.verify().errors == []
+    assert len(calls) == 1
+    assert np.introduces_concept is None
+
+    extra_triple = (URIRef('http://test'), namespaces.HYCL.claims, Literal('Added after signing'))
+    np.assertion.add(extra_triple)
+    assert not np.verify().is_valid
+    np.assertion.remove(extra_triple)
+    assert np.verify().is_valid
+
+    np.pubinfo.add((URIRef(np.source_uri), namespaces.NPX.introduces, URIRef('http://concept')))
+    assert np.introduces_concept == URIRef('http://concept')
+
+
 def test_nanopub_publish():
     expected_trusty = "RAIh8Oq-29dIVTZDhETpJ6f8oxxrILbZ3gSxkyAQY4220"
     assertion = Graph()
@@ -1,4 +1,6 @@
 import os
+import pickle
+from copy import deepcopy
 from pathlib import Path
 
 import pytest
@@ -44,6 +46,21 @@ def test_instantiate_profile_str():
 
 
 
+def test_profile_signer_cached():
+    p = Profile(
+        name='Python Tests',
+        orcid_id='https://orcid.org/0000-0000-0000-0000',
+        private_key=TEST_PRIVATE_KEY,
+        public_key=TEST_PUBLIC_KEY
+    )
+    signer = p.signer
+    assert p.signer is signer
+    assert deepcopy(p).signer is signer
+    assert pickle.loads(pickle.dumps(p)).private_key == TEST_PRIVATE_KEY
+    p.private_key = TEST_PRIVATE_KEY
+    assert p.signer is not signer
+
+
 def test_load_profile():
     p = load_profile(profile_test_path)
 
@@ -0,0 +1,145 @@
+import warnings
+
+import pytest
+import requests
+
+from nanopub import NanopubClient, ServerHealth
+from nanopub.definitions import HTTP_CONNECT_TIMEOUT, NANOPUB_QUERY_URLS, QUERY_READ_TIMEOUT
+from tests.conftest import recording_transport, search_page
+
+
+def test_server_health_order(clock):
+    health = ServerHealth(alpha=0.5, failure_threshold=2, cooldown=30, clock=clock)
+    urls = ["https://a/", "https://b/", "https://c/", "https://d/"]
+    health.record_success("https://a/", 0.4)
+    health.record_success("https://b/", 0.2)
+    health.record_success("https://c/", 0.3)
+    # Servers without a response yet are tried first
+    assert health.order(urls) == ["https://d/", "https://b/", "https://c/", "https://a/"]
+    health.record_success("https://d/", 0.1)
+    health.record_success("https://b/", 0.8)
+    assert health.stats()["https://b/"]["latency"] == pytest.approx(0.5)
+    assert health.order(urls) == ["https://d/", "https://c/", "https://a/", "https://b/"]
+
+    # The circuit is opened after 2 consecutive failures
+    health.record_failure("https://d/")
+    assert health.is_healthy("https://d/")
+    assert health.stats()["https://d/"]["error_rate"] == pytest.approx(0.5)
+    health.record_failure("https://d/")
+    assert not health.is_healthy("https://d/")
+    assert health.order(urls) == ["https://c/", "https://a/", "https://b/", "https://d/"]
+
+    # After the cooldown, one query tries the server first
+    clock.now += 30
+    assert health.order(urls) == ["https://d/", "https://c/", "https://a/", "https://b/"]
+    assert health.order(urls) == ["https://c/", "https://a/", "https://b/", "https://d/"]
+    # A new failure opens the circuit for another cooldown
+    health.record_failure("https://d/")
+    clock.now += 29
+    assert health.order(urls)[-1] == "https://d/"
+    clock.now += 1
+    assert health.order(urls)[0] == "https://d/"
+    health.record_success("https://d/", 0.1)
+    assert health.is_healthy("https://d/")
+    assert health.stats()["https://d/"]["failures"] == 0
+
+
+def test_client_fails_over():
+    down, refused, up = NANOPUB_QUERY_URLS
+    query_urls = list(NANOPUB_QUERY_URLS)
+
+    def respond(request):
+        if request.url.startswith(refused):
+            raise requests.ConnectionError("Connection refused")
+        if request.url.startswith(down):
+            return b"", {}, 502
+        return search_page("np1"), {}
+
+    transport, adapter = recording_transport(respond)
+    health = ServerHealth(failure_threshold=1)
+    client = NanopubClient(transport=transport, server_health=health)
+    health.record_success(down, 0.1)
+    health.record_success(refused, 0.2)
+    health.record_success(up, 0.3)
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        assert [r["np"] for r in client.find_things(type="https://example.org/Type")] == ["np1"]
+    assert len(caught) == 2
+    servers = [[url for url in NANOPUB_QUERY_URLS if request.url.startswith(url)] for request, _kwargs in adapter.sent]
+    assert servers == [[down], [refused], [up]]
+    assert not health.is_healthy(down) and not health.is_healthy(refused) and health.is_healthy(up)
+
+    # The servers that failed are tried last
+    adapter.sent.clear()
+    assert [r["np"] for r in client.find_things(type="https://example.org/Type")] == ["np1"]
+    assert len(adapter.sent) == 1 and adapter.sent[0][0].url.startswith(up)
+    # The list of servers of the module is not changed
+    assert NANOPUB_QUERY_URLS == query_urls
+
+
+def test_client_all_servers_down():
+    def respond(request):
+        raise requests.ConnectTimeout("Timed out")
+
+    transport, adapter = recording_transport(respond)
+    client = NanopubClient(transport=transport, server_health=ServerHealth())
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        with pytest.raises(requests.HTTPError, match="Last error: Timed out"):
+            list(client.find_things(type="https://example.org/Type"))
+    assert len(adapter.sent) == len(NANOPUB_QUERY_URLS)
+
+
+def test_client_fails_over_on_read_timeout():
+    stalled, up, slow = NANOPUB_QUERY_URLS
+
+    def respond(request):
+        if request.url.startswith(stalled):
+            raise requests.ReadTimeout("Read timed out")
+        return search_page("np1"), {}
+
+    transport, adapter = recording_transport(respond)
+    health = ServerHealth()
+    client = NanopubClient(transport=transport, server_health=health)
+    health.record_success(stalled, 0.1)
+    health.record_success(up, 0.2)
+    health.record_success(slow, 0.3)
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        assert [r["np"] for r in client.find_things(type="https://example.org/Type")] == ["np1"]
+    assert len(caught) == 1 and "ReadTimeout" in str(caught[0].message)
+    assert [request.url.startswith(stalled) for request, _kwargs in adapter.sent] == [True, False]
+    assert adapter.sent[1][0].url.startswith(up)
+    # The queries do not wait forever for a stalled server
+    assert all(kwargs["timeout"] == (HTTP_CONNECT_TIMEOUT, QUERY_READ_TIMEOUT) for _request, kwargs in adapter.sent)
+    stats = health.stats()[stalled]
+    assert stats["failures"] == 1 and stats["error_rate"] > 0
+    assert health.stats()[up]["failures"] == 0
+
+
+def test_server_health_error_rate(clock):
+    health = ServerHealth(alpha=0.5, failure_threshold=3, clock=clock)
+    flaky, steady = "https://a/", "https://b/"
+    health.record_success(steady, 0.15)
+    # A faster server failing every other query is tried after a slower one that always answers
+    for _ in range(5):
+        health.record_success(flaky, 0.1)
+        health.record_failure(flaky)
+    assert health.is_healthy(flaky)
+    assert health.order([flaky, steady]) == [steady, flaky]
+    # Among the servers without a response yet, the ones with fewer errors are tried first
+    health.record_failure("https://c/")
+    assert health.order(["https://c/", "https://d/"]) == ["https://d/", "https://c/"]
+
+
+def test_client_error_responses_are_not_recorded():
+    transport, adapter = recording_transport(lambda request: (b"", {}, 400))
+    health = ServerHealth(failure_threshold=2)
+    for url in NANOPUB_QUERY_URLS:
+        health.record_failure(url)
+    client = NanopubClient(transport=transport, server_health=health)
+    with pytest.raises(requests.HTTPError):
+        list(client.find_things(type="https://example.org/Type"))
+    # The server answered, but not with results: its failures and latency are unchanged
+    assert len(adapter.sent) == 1
+    assert all(stats["failures"] == 1 and stats["latency"] is None for stats in health.stats().values())
@@ -1,9 +1,12 @@
+from pathlib import Path
+
 from rdflib import Graph, Literal, URIRef
 
 from nanopub import Nanopub, namespaces
 from nanopub.client import DUMMY_NAMESPACE
-from nanopub.sign_utils import add_signature
-from tests.conftest import default_conf, java_wrap, profile_test
+from nanopub.definitions import NP_PREFIX
+from nanopub.sign_utils import add_signature, replace_trusty_in_graph, verify_nanopub
+from tests.conftest import default_conf, java_wrap, profile_test, testsuite_conf
 
 
 def test_nanopub_sign():
@@ -29,3 +32,58 @@ def test_nanopub_sign():
     np.update_from_signed(signed_g)
     assert np.source_uri == expected_np_uri
     assert np.source_uri == java_np
+
+
+def test_verify_nanopub():
+    assertion = Graph()
+    assertion.add((
+        URIRef('http://test'), namespaces.HYCL.claims, Literal('This is a test of nanopub-python')
+    ))
+    np = Nanopub(
+        conf=default_conf,
+        assertion=assertion
+    )
+    result = np.verify()
+    assert not result.is_valid
+    assert len(result.errors) == 2
+
+    np.sign()
+    result = np.verify()
+    assert result.is_valid
+    assert result.trusty == result.expected_trusty
+    assert result.errors == []
+
+    np.assertion.add((URIRef('http://test'), namespaces.HYCL.claims, Literal('Added after signing')))
+    result = verify_nanopub(np.rdf)
+    assert not result.valid_trusty
+    assert not result.valid_signature
+    assert len(result.errors) == 2
+
+
+def test_verify_nanopub_testsuite():
+    np = Nanopub(
+        conf=testsuite_conf,
+        rdf=Path("./tests/testsuite/valid/signed/simple1-signed-rsa.trig")
+    )
+    assert np.verify().is_valid
+
+
+def test_replace_trusty_in_graph():
+    np = Nanopub(conf=default_conf)
+    ns = np.metadata.namespace
+    np.assertion.add((ns[""], namespaces.HYCL.claims, ns["concept"]))
+    np.assertion.add((ns["concept"], namespaces.HYCL.claims, Literal(str(ns["concept"]))))
+    n_quads = len(np.rdf)
+
+    signed_g = replace_trusty_in_graph("RAxyz", str(ns), np.rdf)
+    # The dummy graph is left untouched, the replaced quads are in a new graph
+    assert signed_g is not np.rdf
+    assert len(np.rdf) == n_quads
+    assert len(signed_g) == n_quads
+    np_uri = URIRef(NP_PREFIX + "RAxyz")
+    assertion = signed_g.get_context(URIRef(f"{np_uri}/assertion"))
+    assert set(assertion) == {
+        (np_uri, namespaces.HYCL.claims, URIRef(f"{np_uri}/concept")),
+        (URIRef(f"{np_uri}/concept"), namespaces.HYCL.claims, Literal(str(ns["concept"]))),
+    }
+    assert ("this", np_uri) in set(signed_g.namespaces())
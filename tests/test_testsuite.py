@@ -3,7 +3,7 @@ from pathlib import Path
 from rdflib import ConjunctiveGraph
 
 from nanopub import Nanopub
-from nanopub.utils import MalformedNanopubError
+from nanopub.utils import MalformedNanopubError, _find_np_rows, _query_np_rows
 from tests.conftest import java_wrap, testsuite_conf
 
 
@@ -131,3 +131,31 @@ def test_testsuite_invalid_plain():
         except MalformedNanopubError as e:
             print(e)
             assert True
+
+
+def test_testsuite_validate():
+    """Valid nanopubs have no violations, invalid ones report the rules they break"""
+    for test_file in Path("./tests/testsuite/valid/trusty").rglob('*'):
+        np = Nanopub(conf=testsuite_conf, rdf=test_file)
+        assert np.validate() == []
+
+    for test_file in Path("./tests/testsuite/invalid/plain").rglob('*'):
+        try:
+            np = Nanopub(conf=testsuite_conf, rdf=test_file)
+        except MalformedNanopubError:
+            continue
+        violations = np.validate()
+        assert len(violations) > 0
+        assert all(v.rule and v.message for v in violations)
+
+
+def test_testsuite_extract_metadata():
+    """Check the triple pattern lookups find the same nanopubs as the SPARQL query"""
+    test_files = Path("./tests/testsuite").rglob('*.trig')
+
+    for test_file in test_files:
+        np_g = ConjunctiveGraph()
+        np_g.parse(test_file)
+        rows = _find_np_rows(np_g)
+        if rows is not None:
+            assert sorted(rows) == sorted(_query_np_rows(np_g))
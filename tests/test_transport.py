@@ -0,0 +1,47 @@
+from copy import deepcopy
+
+from rdflib import ConjunctiveGraph
+
+from nanopub import NanopubClient, NanopubConf
+from nanopub.sign_utils import publish_graph
+from nanopub.transport import HttpTransport, get_transport
+from tests.conftest import recording_transport
+
+
+def test_transport_is_shared_by_copies():
+    transport = HttpTransport()
+    conf = NanopubConf(transport=transport)
+    assert deepcopy(conf).transport is transport
+    assert conf.dict()["transport"] is transport
+    assert get_transport(transport) is transport
+    assert get_transport() is get_transport()
+
+
+def test_transport_pools():
+    transport = HttpTransport(pool_maxsize=3, host_pool_sizes={
+        "query.knowledgepixels.com": 20,
+        "https://registry.petapico.org/np/": 5,
+    })
+    adapter = transport.session.get_adapter("https://query.knowledgepixels.com/api/x")
+    assert adapter._pool_maxsize == 20
+    assert transport.session.get_adapter("https://registry.petapico.org/np/RA")._pool_maxsize == 5
+    assert transport.session.get_adapter("https://example.org/")._pool_maxsize == 3
+
+
+def test_transport_timeout():
+    transport, adapter = recording_transport(timeout=(3, 30))
+    transport.get("https://example.org/a")
+    transport.get("https://example.org/b", timeout=5)
+    assert [kwargs["timeout"] for _request, kwargs in adapter.sent] == [(3, 30), 5]
+
+
+def test_client_uses_transport():
+    transport, adapter = recording_transport()
+    client = NanopubClient(transport=transport)
+    assert list(client.find_nanopubs_with_pattern(subj="https://example.org/s")) == []
+    assert adapter.sent
+    assert all(request.url.startswith(tuple(client.query_urls)) for request, _kwargs in adapter.sent)
+
+    publish_graph(ConjunctiveGraph(), use_server="https://example.org/np/", transport=transport)
+    request, _kwargs = adapter.sent[-1]
+    assert (request.method, request.url) == ("POST", "https://example.org/np/")
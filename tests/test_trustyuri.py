@@ -0,0 +1,466 @@
+import csv
+import hashlib
+import io
+import json
+import random
+from functools import cmp_to_key
+from pathlib import Path
+
+import pytest
+from rdflib import BNode, ConjunctiveGraph, Literal, URIRef
+
+from nanopub.trustyuri import CheckBatch, CheckFile, RunBatch, TrustyUriUtils
+from nanopub.trustyuri.file import FileHasher, ProcessFile
+from nanopub.trustyuri.rdf import (
+    EncodedHasher,
+    HashAdder,
+    QuadParser,
+    QuadWriter,
+    RdfHasher,
+    RdfPreprocessor,
+    RdfTransformer,
+    RdfUtils,
+)
+from nanopub.trustyuri.rdf.ExternalSort import ExternalSorter, encode_key
+from nanopub.trustyuri.rdf.RdfModule import RdfModule
+from nanopub.trustyuri.rdf.RdfPreprocessor import preprocess, transform
+from nanopub.trustyuri.rdf.StatementComparator import StatementComparator
+from nanopub.trustyuri.TrustyUriResource import TrustyUriResource
+
+HASHSTRS = [None, " ", "RAtAU6U_xKTH016Eoiu11SswQkBu1elB_3_BoDJWH3arA"]
+
+
+def random_uri(rnd: random.Random, hashstr=None, plain_str=True):
+    chars = ["a", "b", "B", "/", "#", ".", " ", "é", "Ω", "\U0001F600"]
+    path = "".join(rnd.choice(chars) for _ in range(rnd.randint(0, 4)))
+    if hashstr and rnd.random() < 0.3:
+        path = path + hashstr
+    # Preprocessed quads mix URIRef and plain str
+    if plain_str and rnd.random() < 0.5:
+        return f"http://example.org/{path}"
+    return URIRef(f"http://example.org/{path}")
+
+
+def random_literal(rnd: random.Random):
+    value = "".join(rnd.choice(["a", "b", "1", "\n", "\\", "é"]) for _ in range(rnd.randint(0, 3)))
+    kind = rnd.randint(0, 3)
+    if kind == 0:
+        return Literal(value)
+    if kind == 1:
+        return Literal(value, lang=rnd.choice(["en", "EN", "fr", "en-gb"]))
+    if kind == 2:
+        return Literal(value, datatype=URIRef("http://www.w3.org/2001/XMLSchema#string"))
+    return Literal(value, datatype=rnd.choice([
+        URIRef("http://example.org/datatype"),
+        URIRef("http://example.org/other-datatype"),
+    ]))
+
+
+def random_quad(rnd: random.Random, hashstr=None, plain_str=True):
+    c = None if rnd.random() < 0.2 else random_uri(rnd, hashstr, plain_str)
+    o = random_literal(rnd) if rnd.random() < 0.5 else random_uri(rnd, hashstr, plain_str)
+    return (c, random_uri(rnd, hashstr, plain_str), random_uri(rnd, hashstr, plain_str), o)
+
+
+def sign(x: int) -> int:
+    return (x > 0) - (x < 0)
+
+
+@pytest.mark.parametrize("hashstr", HASHSTRS)
+def test_sort_key_matches_comparator(hashstr):
+    """The precomputed sort key must order quads exactly like StatementComparator.compare"""
+    comp = StatementComparator(hashstr)
+    for seed in range(50):
+        rnd = random.Random(seed)
+        quads = [random_quad(rnd, hashstr) for _ in range(40)]
+        for q1 in quads:
+            for q2 in quads:
+                k1, k2 = comp.sort_key(q1), comp.sort_key(q2)
+                assert sign(comp.compare(q1, q2)) == (k1 > k2) - (k1 < k2)
+        assert sorted(quads, key=comp.sort_key) == sorted(quads, key=cmp_to_key(comp.compare))
+
+
+@pytest.mark.parametrize("hashstr", HASHSTRS)
+def test_make_hash_streams_normalized_quads(hashstr):
+    rnd = random.Random(42)
+    quads = [random_quad(rnd, hashstr, plain_str=False) for _ in range(200)]
+    normed = RdfHasher.normalize_quads(list(quads), hashstr=hashstr)
+    expected = "RA" + TrustyUriUtils.get_base64(hashlib.sha256(normed.encode('utf-8')).digest())
+    assert RdfHasher.make_hash(list(quads), hashstr=hashstr) == expected
+
+
+def test_insert_sorted_quad():
+    rnd = random.Random(7)
+    quads = [random_quad(rnd, " ", plain_str=False) for _ in range(100)]
+    for extra in [random_quad(rnd, " ", plain_str=False) for _ in range(20)] + quads[:5]:
+        sorted_quads = RdfHasher.sort_quads(list(quads), hashstr=" ")
+        RdfHasher.insert_sorted_quad(sorted_quads, extra, hashstr=" ")
+        assert RdfHasher.make_sorted_hash(sorted_quads) == RdfHasher.make_hash(quads + [extra], hashstr=" ")
+
+
+def test_iter_sorted_statements_term_cache():
+    """Terms with the same lexical form but a different kind must not share their cached encoding"""
+    rnd = random.Random(3)
+    quads = [random_quad(rnd, " ") for _ in range(200)]
+    quads += [(None, "http://example.org/a", "http://example.org/a", value) for value in [
+        "http://example.org/a",
+        URIRef("http://example.org/a"),
+        Literal("http://example.org/a"),
+        Literal("http://example.org/a", lang="en"),
+        Literal("a\\b\nc"),
+    ]]
+    expected = [
+        "".join(RdfHasher.value_to_string(v) for v in q) for q in quads
+    ]
+    assert list(RdfHasher.iter_sorted_statements(quads)) == [
+        e for i, e in enumerate(expected) if i == 0 or e != expected[i - 1]
+    ]
+    assert RdfHasher.escape("a\\b\nc") == "a\\\\b\\nc"
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+@pytest.mark.parametrize("hashstr", HASHSTRS)
+def test_encoded_hasher_matches_make_hash(hashstr, use_numpy, monkeypatch):
+    if use_numpy and EncodedHasher.numpy is None:
+        pytest.skip("numpy is not installed")
+    if not use_numpy:
+        monkeypatch.setattr(EncodedHasher, "numpy", None)
+    rnd = random.Random(13)
+    bnodes = [BNode(), BNode(), BNode("named")]
+    quads = []
+    for _ in range(500):
+        c, s, p, o = random_quad(rnd, hashstr, plain_str=False)
+        if rnd.random() < 0.1:
+            s = rnd.choice(bnodes)
+        quads.append((c, s, p, o))
+    # Terms with the same sort key but a different encoding, sorted by the next columns
+    g = URIRef("http://example.org/g")
+    quads += [
+        (g, "http://example.org/x", URIRef("http://example.org/p2"), URIRef("http://example.org/o")),
+        (g, URIRef("http://example.org/x"), URIRef("http://example.org/p1"), URIRef("http://example.org/o")),
+        (g, URIRef("http://example.org/x"), URIRef("http://example.org/p"), Literal("a", lang="EN")),
+        (g, URIRef("http://example.org/x"), URIRef("http://example.org/p"), Literal("a", lang="en")),
+    ]
+    quads += quads[:50]
+    expected = list(RdfHasher.iter_normalized_quads(list(quads), hashstr=hashstr))
+    assert list(EncodedHasher.iter_normalized_quads(list(quads), hashstr=hashstr)) == expected
+    assert EncodedHasher.make_hash(list(quads), hashstr=hashstr) == RdfHasher.make_hash(list(quads), hashstr=hashstr)
+    assert EncodedHasher.make_hash([]) == RdfHasher.make_hash([])
+
+
+def test_sort_order(monkeypatch):
+    columns = [[1, 0, 1, 0, 1], [0, 2, 0, 1, 0], [3, 0, 2, 0, 3]]
+    expected = [3, 1, 2, 0, 4]
+    assert EncodedHasher.sort_order(columns) == expected
+    monkeypatch.setattr(EncodedHasher, "numpy", None)
+    assert EncodedHasher.sort_order(columns) == expected
+
+
+@pytest.mark.parametrize("baseuri", [
+    None,
+    "http://purl.org/nanopub/temp/np/",
+    "http://example.org/np#",
+    "http://example.org/np/",
+    "http://example.org/np",
+])
+@pytest.mark.parametrize("hashstr", HASHSTRS)
+def test_preprocess_matches_transform(hashstr, baseuri):
+    rnd = random.Random(11)
+    bnodes = [BNode(), BNode(), BNode("named")]
+    terms = [baseuri, baseuri and baseuri.rstrip("#/"), "http://example.org/np/sub"] if baseuri else []
+    quads = []
+    for _ in range(300):
+        c, s, p, o = random_quad(rnd, hashstr, plain_str=False)
+        if rnd.random() < 0.3:
+            s = rnd.choice(bnodes)
+        if rnd.random() < 0.2:
+            o = rnd.choice(bnodes)
+        if terms and rnd.random() < 0.3:
+            s = URIRef(rnd.choice(terms))
+        quads.append((c, s, p, o))
+
+    bnodemap: dict = {}
+    expected = []
+    for c, s, p, o in quads:
+        c = transform(c, hashstr, baseuri, bnodemap)
+        s = transform(s, hashstr, baseuri, bnodemap)
+        p = transform(p, hashstr, baseuri, bnodemap)
+        if isinstance(o, (URIRef, BNode)):
+            o = transform(o, hashstr, baseuri, bnodemap)
+        expected.append((c, s, p, o))
+    assert preprocess(quads, hashstr=hashstr, baseuri=baseuri) == expected
+
+
+TESTSUITE_RDF_FILES = sorted(
+    f for f in Path("./tests/testsuite").rglob("*") if f.suffix in (".trig", ".nq")
+)
+
+
+@pytest.mark.parametrize("test_file", TESTSUITE_RDF_FILES, ids=str)
+def test_parse_quads_matches_rdflib(test_file):
+    rdf_format = RdfUtils.get_format(str(test_file))
+    content = test_file.read_text()
+    cg = ConjunctiveGraph()
+    cg.parse(data=content, format=rdf_format)
+    assert set(QuadParser.parse_quads(content, rdf_format)) == set(RdfUtils.get_quads(cg))
+    assert set(QuadParser.parse_quads(content.encode("utf-8"), rdf_format)) == set(RdfUtils.get_quads(cg))
+
+
+def test_parse_quads_trig_syntax():
+    content = "\n".join([
+        'PREFIX ex: <http://example.org/>',
+        '@prefix : <http://example.org/default#> .',
+        'ex:s ex:p "in default graph" .',
+        'GRAPH ex:g1 {',
+        '  ex:s a ex:Type ;',
+        '    ex:int +007, -3 ; ex:dec 1.50, -.5 ; ex:double 1.0e3 ; ex:bool true, false ;',
+        '    ex:str "esc \\"q\\" \\u00e9\\n", \'single\', """long "quoted"',
+        'line""", \'\'\'long \'\'x\'\'\'\'\' ;',
+        '    ex:lang "hello"@en-GB ; ex:typed "x"^^ex:datatype, "y"^^<http://example.org/dt> ;',
+        '    :local ex:with\\#escape, ex:a.b ;',
+        '  .',
+        '}',
+        '<http://example.org/g2> { <http://example.org/s> <http://example.org/p> ex: }',
+    ])
+    cg = ConjunctiveGraph()
+    cg.parse(data=content, format="trig")
+    quads = QuadParser.parse_quads(content, "trig")
+    assert len(quads) == 19
+    assert set(quads) == set(RdfUtils.get_quads(cg))
+
+
+def test_read_quads_fallback():
+    content = """@prefix ex: <http://example.org/> .
+ex:graph { ex:s ex:p [ ex:q "blank" ] . }
+"""
+    with pytest.raises(QuadParser.UnsupportedSyntaxError):
+        QuadParser.parse_quads(content, "trig")
+    quads = RdfUtils.read_quads(content, "trig")
+    assert len(quads) == 2
+
+
+def test_rdf_module_has_correct_hash():
+    trusty = "RAHI3NLg6QMN59b2_pU1ukmu07N2LR44bXHmrevZaccRY"
+    content = Path("./tests/testsuite/valid/trusty/fair-definition-1.trig").read_text()
+    assert RdfModule().has_correct_hash(TrustyUriResource(f"{trusty}.trig", content, trusty))
+    tampered = content.replace('"F1"@en', '"F2"@en')
+    assert not RdfModule().has_correct_hash(TrustyUriResource(f"{trusty}.trig", tampered, trusty))
+
+
+def test_encode_key_order():
+    comp = StatementComparator()
+    rnd = random.Random(5)
+    quads = [random_quad(rnd) for _ in range(500)]
+    keys = [comp.sort_key(q) for q in quads]
+    assert sorted(keys, key=encode_key) == sorted(keys)
+    assert [comp.sort_key_bytes(q) for q in quads] == [encode_key(k) for k in keys]
+    keys = [(b"ab", b""), (b"a", b"b"), (b"a\x00", b""), (b"a\x00b", b""), (b"a", b"")]
+    assert sorted(keys, key=encode_key) == sorted(keys)
+
+
+def test_external_sorter(tmp_path):
+    rnd = random.Random(9)
+    records = [(bytes(rnd.choices(b"ab\x00", k=rnd.randint(0, 4))), str(i).encode()) for i in range(500)]
+    with ExternalSorter(run_size=7, tmpdir=str(tmp_path), fan_in=3) as sorter:
+        for key, value in records:
+            sorter.add(key, value)
+        assert list(sorter.sorted()) == sorted(records)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_get_conjunctivegraph():
+    rnd = random.Random(17)
+    quads = [random_quad(rnd, plain_str=False) for _ in range(300)]
+    cg = RdfUtils.get_conjunctivegraph(quads)
+    assert set(RdfUtils.get_quads(cg)) == set(quads)
+    contexts = {c for c, _s, _p, _o in quads}
+    assert {g.identifier for g in cg.contexts()} == (contexts - {None}) | {cg.default_context.identifier}
+
+
+@pytest.mark.parametrize("rdf_format", QuadWriter.FORMATS)
+def test_quad_writer(rdf_format):
+    rnd = random.Random(19)
+    uris = [URIRef(f"http://example.org/{name}") for name in ["a", "b#c", "d/é", "e?f=g&h"]]
+    literals = [
+        Literal('quote " back \\ lines \n \r <tag> & é \U0001F600'),
+        Literal("hello", lang="en-GB"),
+        Literal("1", datatype=URIRef("http://www.w3.org/2001/XMLSchema#integer")),
+        Literal(""),
+    ]
+    quads = [
+        (rnd.choice(uris + [None]), rnd.choice(uris), rnd.choice(uris), rnd.choice(uris + literals))
+        for _ in range(200)
+    ]
+    # Sorted like the transforms do, unsorted quads must also give valid output
+    for ordered in [EncodedHasher.make_hash_and_sort(list(quads))[1], quads]:
+        ordered = [HashAdder.addhash([q], "")[0] for q in ordered]
+        out = io.StringIO()
+        QuadWriter.write_quads(ordered + ordered[-1:], out, rdf_format)
+        cg = ConjunctiveGraph()
+        cg.parse(data=out.getvalue(), format=rdf_format)
+        parsed = {(None if c == cg.default_context.identifier else c, s, p, o) for c, s, p, o in RdfUtils.get_quads(cg)}
+        assert parsed == set(ordered)
+    with pytest.raises(ValueError):
+        QuadWriter.write_quads(quads, out, "turtle")
+
+
+@pytest.mark.parametrize("extension", [".trig", ".nq", ".xml"])
+def test_transform_to_file_quad_writer(tmp_path, extension):
+    baseuri = URIRef("http://example.org/nanopub-validator-example/")
+    cg = ConjunctiveGraph()
+    cg.parse("./tests/testsuite/transform/trusty/aida1.in.trig", format="trig")
+    quads = RdfPreprocessor.preprocess(RdfUtils.get_quads(cg), hashstr=" ", baseuri=baseuri)
+    hashstr = RdfHasher.make_hash(list(quads))
+    expected = set(HashAdder.addhash(quads, hashstr))
+
+    trusty_uri = RdfTransformer.transform_to_file(cg, baseuri, str(tmp_path), f"aida1{extension}")
+    assert trusty_uri.endswith(hashstr)
+    out_file = tmp_path / f".{hashstr}{extension}"
+    parsed = ConjunctiveGraph()
+    parsed.parse(out_file, format=RdfUtils.get_format(str(out_file)))
+    assert set(RdfUtils.get_quads(parsed)) == expected
+    assert RdfModule().has_correct_hash(TrustyUriResource(str(out_file), out_file.read_bytes(), hashstr))
+
+    parsed = ConjunctiveGraph()
+    parsed.parse(data=RdfTransformer.transform_to_string(cg, baseuri), format="trix")
+    assert set(RdfUtils.get_quads(parsed)) == expected
+
+
+def test_transform_large_file(tmp_path):
+    baseuri = URIRef("http://example.org/nanopub-validator-example/")
+    in_file = tmp_path / "simple1.nq"
+    in_file.write_text(Path("./tests/testsuite/valid/plain/simple1.nq").read_text())
+    cg = ConjunctiveGraph()
+    cg.parse(in_file, format="nquads")
+    in_memory_dir = tmp_path / "in_memory"
+    in_memory_dir.mkdir()
+    expected_uri = RdfTransformer.transform_to_file(cg, baseuri, str(in_memory_dir), str(in_file))
+
+    trusty_uri = RdfTransformer.transform_large_file(str(in_file), baseuri, str(tmp_path), run_size=2)
+    assert trusty_uri == expected_uri
+    trusty = TrustyUriUtils.get_trustyuri_tail(trusty_uri)
+    out_file = tmp_path / f".{trusty}.nq"
+    expected = ConjunctiveGraph()
+    expected.parse(in_memory_dir / out_file.name, format="nquads")
+    assert set(RdfUtils.read_quads(out_file.read_text(), "nquads")) == set(RdfUtils.get_quads(expected))
+    assert RdfModule().has_correct_hash(TrustyUriResource(str(out_file), out_file.read_text(), trusty))
+
+
+def test_transform_large_file_line_separators(tmp_path):
+    # Characters splitting lines for str.splitlines() but allowed unescaped in N-Quads literals
+    value = "a\u2028b\u2029c\x85d\x0be\x0cf\x1cg\x1dh\x1ei"
+    content = f'<http://example.org/s> <http://example.org/p> "{value}" <http://example.org/g> .\n'
+    in_file = tmp_path / "separators.nq"
+    in_file.write_text(content, encoding="utf-8")
+    cg = ConjunctiveGraph()
+    cg.parse(in_file, format="nquads")
+    assert [o for _c, _s, _p, o in QuadParser.parse_quads(content, "nquads")] == [Literal(value)]
+    assert set(QuadParser.parse_quads(content, "nquads")) == set(RdfUtils.get_quads(cg))
+
+    baseuri = URIRef("http://example.org/")
+    in_memory_dir = tmp_path / "in_memory"
+    in_memory_dir.mkdir()
+    expected_uri = RdfTransformer.transform_to_file(cg, baseuri, str(in_memory_dir), str(in_file))
+    assert RdfTransformer.transform_large_file(str(in_file), baseuri, str(tmp_path)) == expected_uri
+
+
+def test_transform_large_file_blank_nodes(tmp_path):
+    in_file = tmp_path / "bnodes.nq"
+    in_file.write_text('_:b1 <http://example.org/p> "o" <http://example.org/g> .\n')
+    with pytest.raises(QuadParser.UnsupportedSyntaxError):
+        RdfTransformer.transform_large_file(str(in_file), URIRef("http://example.org/"), str(tmp_path))
+
+
+def test_file_hash(tmp_path):
+    # Line endings and invalid UTF-8 must be hashed as they are
+    content = b"line 1\r\nline 2\n\xff\x00" * 1000
+    expected = "FA" + TrustyUriUtils.get_base64(hashlib.sha256(content).digest())
+    data_file = tmp_path / "data.csv"
+    data_file.write_bytes(content)
+    assert FileHasher.make_hash(content) == expected
+    assert FileHasher.make_file_hash(str(data_file), chunk_size=7) == expected
+    with open(data_file, "rb") as f:
+        assert FileHasher.make_hash(f) == expected
+
+    ProcessFile.process([str(data_file)])
+    hashed_file = tmp_path / f"data.{expected}.csv"
+    assert hashed_file.read_bytes() == content
+
+
+def test_check_file(tmp_path, capsys):
+    hashed_file = tmp_path / "wrong.FAaBcR4p2DnOy0SqOlG8fx0aymlzc52j-BWsCP-r9Ju_Y.txt"
+    hashed_file.write_bytes(b"wrong content")
+    CheckFile.check([str(hashed_file)])
+    assert capsys.readouterr().out == "*** INCORRECT HASH ***\n"
+
+    data_file = tmp_path / "data.txt"
+    data_file.write_bytes(b"a\r\nb")
+    ProcessFile.process([str(data_file)])
+    hashed_file = next(tmp_path.glob("data.FA*.txt"))
+    CheckFile.check([str(hashed_file)])
+    assert capsys.readouterr().out.startswith("Correct hash: FA")
+
+    trusty = "RAHI3NLg6QMN59b2_pU1ukmu07N2LR44bXHmrevZaccRY"
+    rdf_file = tmp_path / f"{trusty}.trig"
+    rdf_file.write_text(Path("./tests/testsuite/valid/trusty/fair-definition-1.trig").read_text())
+    CheckFile.check([str(rdf_file)])
+    assert capsys.readouterr().out == f"Correct hash: {trusty}\n"
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_check_batch(tmp_path, workers):
+    archive = tmp_path / "archive"
+    (archive / "sub").mkdir(parents=True)
+    for i in range(3):
+        data_file = archive / "sub" / f"data{i}.txt"
+        data_file.write_bytes(f"data {i}\r\n".encode())
+        ProcessFile.process([str(data_file)])
+    (archive / "wrong.FAaBcR4p2DnOy0SqOlG8fx0aymlzc52j-BWsCP-r9Ju_Y.txt").write_bytes(b"wrong")
+    (archive / "README.md").write_text("not checked")
+    trusty = "RAHI3NLg6QMN59b2_pU1ukmu07N2LR44bXHmrevZaccRY"
+    rdf_file = tmp_path / f"{trusty}.trig"
+    rdf_file.write_text(Path("./tests/testsuite/valid/trusty/fair-definition-1.trig").read_text())
+    list_file = tmp_path / "inputs.txt"
+    list_file.write_text(f"# Inputs\n{tmp_path}/*.trig\n\n{tmp_path}/missing.FAaBcR4p2DnOy0SqOlG8fx0aymlzc52j-BWsCP-r9Ju_Y\n")
+
+    results = CheckBatch.check_batch([str(archive), f"@{list_file}"], workers=workers)
+    assert [(Path(r["location"]).name[:4], r["module"], r["correct"]) for r in results] == [
+        ("wron", "FA", False), ("data", "FA", True), ("data", "FA", True), ("data", "FA", True),
+        (trusty[:4], "RA", True), ("miss", "FA", None),
+    ]
+    assert results[-1]["error"].startswith("FileNotFoundError")
+    assert all(r["seconds"] >= 0 for r in results)
+
+    out = io.StringIO()
+    CheckBatch.write_report(results, out, "json")
+    assert json.loads(out.getvalue()) == results
+    out = io.StringIO()
+    CheckBatch.write_report(results, out, "csv")
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert [row["location"] for row in rows] == [r["location"] for r in results]
+    assert list(rows[0]) == CheckBatch.REPORT_FIELDS
+
+
+def test_run_batch(tmp_path, capsys):
+    data_file = tmp_path / "data.txt"
+    data_file.write_bytes(b"data")
+    ProcessFile.process([str(data_file)])
+    hashed_file = next(tmp_path.glob("data.FA*.txt"))
+    script = tmp_path / "batch.txt"
+    changed_file = tmp_path / hashed_file.name.replace("data", "changed")
+    changed_file.write_bytes(b"changed data")
+    script.write_text(
+        f"# Comment\n\nCheckFile {hashed_file}\nCheckFile {tmp_path}/missing.txt\nCheckFile {changed_file}\n"
+    )
+
+    results = RunBatch.run_batch(RunBatch.read_commands(str(script)), repeat=5, warmup=2, quiet=True)
+    assert capsys.readouterr().out == ""
+    # An incorrect hash is a failed run
+    assert [(r["runs"], r["errors"]) for r in results] == [(5, 0), (5, 5), (5, 5)]
+    assert all(0 <= r["min"] <= r["median"] <= r["p95"] for r in results)
+
+    summary = RunBatch.summarize("cmd", [float(i) for i in range(100, 0, -1)])
+    assert (summary["min"], summary["median"], summary["p95"]) == (1.0, 50.5, 95.0)
+    script.write_text("Unknown command\n")
+    with pytest.raises(ValueError):
+        RunBatch.read_commands(str(script))